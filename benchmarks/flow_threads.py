@@ -0,0 +1,50 @@
+"""FLOW throughput of DeltaComputer versus thread count.
+
+    python benchmarks/flow_threads.py --qubits 24 --mode statevector
+    python benchmarks/flow_threads.py --qubits 12 --mode density --threads 1 2 4 8
+
+Prints one row per thread count with seconds per FLOW and speedup over the
+first (normally single-threaded) row.
+"""
+import argparse, os, pathlib, sys, time
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from bh_core.delta_kernel import DeltaComputer  # noqa: E402
+
+
+def parse() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--qubits", type=int, default=22)
+    p.add_argument("--mode", choices=("statevector", "density"), default="statevector")
+    p.add_argument("--flows", type=int, default=20, help="FLOWs timed per thread count")
+    cpus = os.cpu_count() or 1
+    p.add_argument("--threads", type=int, nargs="+",
+                   default=sorted({1, 2, 4, 8, cpus} & set(range(1, cpus + 1))))
+    return p.parse_args()
+
+
+def main():
+    args = parse()
+    n = args.qubits
+    # a few distinct gates cycled, so every operator stays in the FLOW cache
+    distinct = [(0, 1, n - 1), (n - 1, 0, n // 2), (n // 2, 1, 2), (2, n - 2, 0)]
+    gates = [distinct[k % len(distinct)] for k in range(args.flows)]
+    base = None
+    print(f"{'threads':>7} {'s/FLOW':>10} {'speedup':>8}")
+    for threads in args.threads:
+        comp = DeltaComputer(mode=args.mode, threads=threads)
+        comp.load_bitstring("0" * n)
+        for g in gates:  # warm operator cache and scratch buffer
+            comp.flow(*g)
+        t = time.perf_counter()
+        for g in gates:
+            comp.flow(*g)
+        per = (time.perf_counter() - t) / len(gates)
+        comp.close()
+        base = base or per
+        print(f"{threads:>7} {per:>10.4g} {base / per:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
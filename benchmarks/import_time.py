@@ -0,0 +1,63 @@
+"""CLI cold-start budget check using ``python -X importtime``.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --module bh_core.batch --budget-ms 150
+
+Imports the module in a fresh interpreter, prints the slowest imports and
+exits non-zero if the cumulative import time exceeds the budget or a
+forbidden heavy dependency (qutip by default) was loaded at startup.
+"""
+import argparse, pathlib, subprocess, sys
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+
+def parse() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--module", default="bh_core.simulate_bh")
+    p.add_argument("--budget-ms", type=float, default=250.0,
+                   help="Maximum cumulative import time of --module")
+    p.add_argument("--forbid", nargs="*", default=["qutip"],
+                   help="Top-level packages that must not be imported at startup")
+    p.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    p.add_argument("--repeat", type=int, default=3, help="Runs; the fastest is reported")
+    return p.parse_args()
+
+
+def measure(module: str):
+    """Return [(cumulative_us, self_us, name)] for one cold import of ``module``."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, cwd=ROOT, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cum_us), int(self_us), name.rstrip()))
+    return rows
+
+
+def main():
+    args = parse()
+    runs = [measure(args.module) for _ in range(args.repeat)]
+
+    def total(rows):
+        return next(cum for cum, _, name in rows if name.strip() == args.module)
+
+    rows = min(runs, key=total)
+    total_ms = total(rows) / 1000
+    print(f"{'self ms':>8} {'cum ms':>8}  module")
+    for cum, own, name in sorted(rows, key=lambda r: -r[1])[: args.top]:
+        print(f"{own / 1000:8.1f} {cum / 1000:8.1f}  {name.strip()}")
+    loaded = {name.strip().split(".")[0] for _, _, name in rows}
+    forbidden = sorted(loaded & set(args.forbid))
+    print(f"\n{args.module}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    if forbidden:
+        print(f"FAIL: imported at startup: {', '.join(forbidden)}")
+    if total_ms > args.budget_ms:
+        print("FAIL: over budget")
+    sys.exit(1 if forbidden or total_ms > args.budget_ms else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Classical fast path for the Δ-Kernel.
+
+FLOW only swaps two bits conditioned on a third, so on computational-basis
+inputs a compiled program is a reversible classical circuit.  ``BitComputer``
+runs it on a plain byte array – no qutip, O(1) per FLOW – and reports the
+same observables ``DeltaComputer`` would.
+"""
+from typing import List, Dict
+
+import numpy as np
+
+from bh_core.flowfile import iter_program
+from bh_core.permutation import check_flow, check_perm
+from bh_core.program import FlowProgram
+
+__all__ = ["BitComputer", "basis_bit"]
+
+
+def basis_bit(state):
+    """Return 0/1 if ``state`` is a computational-basis qubit, else None.
+
+    Accepts ``0``/``1``, ``"0"``/``"1"`` or any single-qubit ket or density
+    matrix exposing ``.full()`` (e.g. a qutip ``Qobj``).
+    """
+    if isinstance(state, (int, str)):
+        return int(state) if str(state) in ("0", "1") else None
+    data = np.asarray(state.full())
+    if data.shape == (2, 1):
+        weights = np.abs(data[:, 0]) ** 2
+    elif data.shape == (2, 2):
+        weights = np.abs(np.diag(data))
+        if abs(data[0, 1]) > 1e-12:
+            return None
+    else:
+        return None
+    for bit in (0, 1):
+        if abs(weights[bit] - 1) < 1e-12 and abs(weights[1 - bit]) < 1e-12:
+            return bit
+    return None
+
+
+class BitComputer:
+    """Δ-Kernel on computational-basis states, stored as one byte per qubit."""
+
+    def __init__(self, bits: str = ""):
+        self.bits = bytearray()
+        self.load_bitstring(bits)
+
+    @property
+    def num_qubits(self) -> int:
+        return len(self.bits)
+
+    # ───────────────────────────────────────────── Accretion
+    def accrete(self, state):
+        """Append a basis qubit (bit, ``"0"``/``"1"`` or basis ket/density matrix)."""
+        bit = basis_bit(state)
+        if bit is None:
+            raise ValueError("BitComputer only accepts computational-basis states")
+        self.bits.append(bit)
+
+    def load_bitstring(self, bits: str):
+        if set(bits) - {"0", "1"}:
+            raise ValueError("Input must be bitstring")
+        self.bits.extend(int(b) for b in bits)
+
+    # ───────────────────────────────────────────── Primitive
+    def flow(self, ctrl: int, t1: int, t2: int):
+        check_flow(self.num_qubits, ctrl, t1, t2)
+        b = self.bits
+        if not b[ctrl]:
+            b[t1], b[t2] = b[t2], b[t1]
+
+    def permute(self, qubits: List[int], table: List[int]):
+        """Apply a fused block: basis state ``l`` of ``qubits`` goes to ``table[l]``."""
+        check_perm(self.num_qubits, qubits, table)
+        b = self.bits
+        local = 0
+        for q in qubits:
+            local = (local << 1) | b[q]
+        image = table[local]
+        for pos, q in enumerate(reversed(qubits)):
+            b[q] = (image >> pos) & 1
+
+    # ───────────────────────────────────────────── Program execution
+    def execute(self, program: List[Dict]):
+        """Execute compiled FLOW list; PERM blocks, tuples and (k, 3) arrays are accepted too."""
+        if isinstance(program, np.ndarray):
+            program = FlowProgram(program)
+        if isinstance(program, FlowProgram):
+            # validated once, then a bare swap loop with no per-gate dispatch
+            program.check(self.num_qubits)
+            b = self.bits
+            for c, t1, t2 in program:
+                if not b[c]:
+                    b[t1], b[t2] = b[t2], b[t1]
+            return
+        for inst in iter_program(program):
+            if isinstance(inst, tuple):
+                self.flow(*inst)
+            elif inst["op"] == "FLOW":
+                self.flow(inst["ctrl"], inst["t1"], inst["t2"])
+            elif inst["op"] == "PERM":
+                self.permute(inst["qubits"], inst["table"])
+            else:
+                raise ValueError("Program must be pre-compiled to FLOW ops")
+
+    # ───────────────────────────────────────────── Observables
+    def measure_z(self, qubit: int = 0) -> float:
+        if not self.bits:
+            raise RuntimeError("No state loaded")
+        return -1.0 if self.bits[qubit] else 1.0
+
+    def marginal_probabilities(self) -> np.ndarray:
+        bits = np.frombuffer(bytes(self.bits), dtype=np.uint8)
+        return np.stack([1 - bits, bits], axis=1).astype(float)
+
+    def measure_all_z(self) -> np.ndarray:
+        if not self.bits:
+            raise RuntimeError("No state loaded")
+        return 1.0 - 2.0 * np.frombuffer(bytes(self.bits), dtype=np.uint8)
+
+    def output(self) -> str:
+        return "".join("1" if b else "0" for b in self.bits)
+
+    def ent_matrix(self) -> np.ndarray:
+        # basis states stay product states: every pair entropy is zero
+        return np.zeros((self.num_qubits, self.num_qubits))
+
+    def trace_norm(self) -> float:
+        return 1.0 if self.bits else 0.0
@@ -1,7 +1,22 @@
-import json
-from typing import List, Dict
+import hashlib, json, os, tempfile
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
 
-__all__ = ["compile_program"]
+import numpy as np
+
+from bh_core.flowfile import load_binary, save_binary
+from bh_core.permutation import apply_flow
+from bh_core.program import FlowProgram
+
+__all__ = [
+    "compile_program", "compile_iter", "compile_flows", "iter_jsonl", "optimize_program", "fuse_flows",
+    "OPT_LEVELS", "COMPILER_VERSION", "ProgramCache",
+]
+
+OPT_LEVELS = (0, 1, 2)
+# bump whenever compiled output for the same gate list changes: invalidates ProgramCache
+COMPILER_VERSION = 1
+DEFAULT_CACHE_DIR = os.environ.get("BH_CACHE_DIR") or os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "bh_core")
 
 
 def compile_program(gate_list: List[Dict]) -> List[Dict]:
@@ -13,28 +28,287 @@ def compile_program(gate_list: List[Dict]) -> List[Dict]:
     ● TOFF  {"op":"TOFF","c1":c1,"c2":c2,"target":t}
     Output list items: {op:"FLOW", ctrl:int, t1:int, t2:int}
     """
-    flows = []
-    for g in gate_list:
+    return list(compile_iter(gate_list))
+
+
+def compile_iter(gates: Iterable[Dict]) -> Iterator[Dict]:
+    """Lazy :func:`compile_program`: yield FLOWs as gates are read, holding none."""
+    for g in gates:
         op = g["op"].upper()
         if op == "NOT":
             t = g["target"]
             if t == 0:
                 raise ValueError("NOT target cannot be 0 – reserve qubit0 as control |0>")
-            flows.append({"op": "FLOW", "ctrl": 0, "t1": t, "t2": t + 1})
+            yield {"op": "FLOW", "ctrl": 0, "t1": t, "t2": t + 1}
         elif op == "CNOT":
             c, t = g["control"], g["target"]
-            flows.append({"op": "FLOW", "ctrl": c, "t1": c, "t2": t})
+            yield {"op": "FLOW", "ctrl": c, "t1": c, "t2": t}
         elif op == "TOFF":
             c1, c2, t = g["c1"], g["c2"], g["target"]
             # Decompose Toffoli into 2 controlled swaps using c1 as control on (c2,t)
-            flows.append({"op": "FLOW", "ctrl": c1, "t1": c2, "t2": t})
-            flows.append({"op": "FLOW", "ctrl": c2, "t1": c1, "t2": t})
-            flows.append({"op": "FLOW", "ctrl": c1, "t1": c2, "t2": t})
+            yield {"op": "FLOW", "ctrl": c1, "t1": c2, "t2": t}
+            yield {"op": "FLOW", "ctrl": c2, "t1": c1, "t2": t}
+            yield {"op": "FLOW", "ctrl": c1, "t1": c2, "t2": t}
         else:
             raise ValueError(f"Unsupported gate {op}")
-    return flows
+
+
+def compile_flows(gate_list: Iterable[Dict]) -> FlowProgram:
+    """:func:`compile_program` straight into a struct-of-arrays ``FlowProgram``."""
+    return FlowProgram.from_flows(compile_iter(gate_list))
+
+
+def _flow_args(inst):
+    """(ctrl, t1, t2) of a FLOW dict or tuple; None for PERM blocks."""
+    if isinstance(inst, tuple):
+        return inst
+    if inst["op"] == "FLOW":
+        return inst["ctrl"], inst["t1"], inst["t2"]
+    return None
+
+
+def _support(inst):
+    """(qubits read, qubits written) by a compiled instruction."""
+    args = _flow_args(inst)
+    if args is not None:
+        return set(args), set(args[1:])
+    qs = set(inst["qubits"])
+    return qs, qs
+
+
+def _commute(a, b) -> bool:
+    (ra, wa), (rb, wb) = _support(a), _support(b)
+    return not (wa & rb or wb & ra)
+
+
+def _involution_key(inst):
+    """Key equal for FLOWs that cancel pairwise; None if the FLOW is not a permutation."""
+    args = _flow_args(inst)
+    if args is None or len(set(args)) != 3:
+        return None
+    c, t1, t2 = args
+    return c, min(t1, t2), max(t1, t2)
+
+
+def optimize_program(program: List[Dict], level: int = 1, window: int = 64) -> Tuple[List[Dict], Dict]:
+    """Peephole-optimize a compiled FLOW program.
+
+    level 0: program unchanged.
+    level 1: drop no-op FLOWs (t1 == t2) and cancel adjacent identical FLOWs –
+             a controlled SWAP is self-inverse.
+    level 2: also look back past up to ``window`` gates that commute with the
+             new one (no qubit written by one is used by the other) to find
+             its cancelling partner.
+    A ``FlowProgram`` goes in and comes out as a ``FlowProgram``.
+    Returns (program, stats).
+    """
+    if level not in OPT_LEVELS:
+        raise ValueError(f"Unknown optimization level {level}")
+    stats = {"ops_in": len(program), "noops": 0, "cancelled": 0}
+    soa = isinstance(program, FlowProgram)
+    if level == 0:
+        stats["ops_out"] = len(program)
+        return (program if soa else list(program)), stats
+    reach = 1 if level == 1 else window
+    out: List = []
+    for inst in program:
+        args = _flow_args(inst)
+        if args is not None and args[1] == args[2]:
+            stats["noops"] += 1
+            continue
+        key = _involution_key(inst)
+        partner = None
+        if key is not None:
+            for j in range(len(out) - 1, max(len(out) - 1 - reach, -1), -1):
+                if _involution_key(out[j]) == key:
+                    partner = j
+                    break
+                if not _commute(out[j], inst):
+                    break
+        if partner is None:
+            out.append(inst)
+        else:
+            del out[partner]
+            stats["cancelled"] += 2
+    stats["ops_out"] = len(out)
+    return (FlowProgram.from_flows(out) if soa else out), stats
+
+
+def _fuse_block(block: List[Tuple[int, int, int]]) -> Dict:
+    """Compose a run of FLOWs into one PERM over the qubits they touch."""
+    qubits = sorted({q for f in block for q in f})
+    pos = {q: i for i, q in enumerate(qubits)}
+    k = len(qubits)
+    table = np.arange(2 ** k)
+    for c, t1, t2 in block:
+        table = apply_flow(table, k, pos[c], pos[t1], pos[t2])
+    return {"op": "PERM", "qubits": qubits, "table": table.tolist()}
+
+
+def fuse_flows(program: List[Dict], max_qubits: int = 6) -> Tuple[List[Dict], Dict]:
+    """Merge runs of adjacent FLOWs into block permutations.
+
+    A run is extended while the qubits it touches stay within ``max_qubits``;
+    runs of two or more FLOWs become {op:"PERM", qubits:[..], table:[..]}, so
+    the executor touches the state once per block instead of once per gate.
+    FLOWs whose ctrl/t1/t2 are not distinct are not permutations and are
+    passed through unfused.  A ``FlowProgram`` is accepted; the result is a
+    list, since PERM blocks do not fit its columns.  Returns (program, stats).
+    """
+    out, block, insts, touched = [], [], [], set()
+    stats = {"ops_in": len(program), "blocks": 0, "fused": 0}
+
+    def flush():
+        if len(block) > 1:
+            out.append(_fuse_block(block))
+            stats["blocks"] += 1
+            stats["fused"] += len(block)
+        else:
+            out.extend(insts)
+        block.clear()
+        insts.clear()
+        touched.clear()
+
+    for inst in program:
+        args = _flow_args(inst)
+        qs = set(args) if args is not None else set()
+        if len(qs) != 3:
+            flush()
+            out.append(inst)
+            continue
+        if len(touched | qs) > max_qubits:
+            flush()
+        block.append(args)
+        insts.append(inst)
+        touched |= qs
+    flush()
+    stats["ops_out"] = len(out)
+    return out, stats
 
 
 def load_json(path: str) -> List[Dict]:
     with open(path, "r") as f:
-        return json.load(f) 
\ No newline at end of file
+        return json.load(f)
+
+
+def iter_jsonl(path: str) -> Iterator[Dict]:
+    """Yield gates from a JSON Lines file (one gate object per line) incrementally."""
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class ProgramCache:
+    """On-disk cache of compiled (and optimized) programs in binary FLOW form.
+
+    Entries are keyed by a hash of the gate-list file contents, the compiler
+    version and the optimization level, so a repeat run memory-maps the
+    compiled program instead of parsing and compiling again.  The least
+    recently used entries are evicted once the directory exceeds ``max_bytes``.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_DIR, max_bytes: int = 256 << 20):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = self.misses = self.evictions = 0
+
+    @staticmethod
+    def key(source: bytes, level: int = 0, window: int = 64) -> str:
+        h = hashlib.sha256(source)
+        h.update(f"|v{COMPILER_VERSION}|O{level}|w{window}".encode())
+        return h.hexdigest()
+
+    def file(self, key: str) -> str:
+        """Cache file holding the program for ``key``."""
+        return os.path.join(self.path, key + ".bhf")
+
+    def get(self, key: str):
+        """Mapped ``FlowProgram`` for ``key``, or None on a miss."""
+        try:
+            prog = load_binary(self.file(key))
+            # mtime doubles as LRU order; side files are touched after the
+            # program so they never look older (stale) than it
+            os.utime(self.file(key))
+            for name in os.listdir(self.path):
+                if name.startswith(key + ".bhf."):
+                    os.utime(os.path.join(self.path, name))
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return prog
+
+    def put(self, key: str, program) -> int:
+        os.makedirs(self.path, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        os.close(fd)
+        try:
+            count = save_binary(tmp, program)
+        except BaseException:
+            os.remove(tmp)  # e.g. a bad gate halfway through a streamed program
+            raise
+        os.replace(tmp, self.file(key))  # readers never see a partial entry
+        self.evict(keep=key)
+        return count
+
+    def evict(self, keep: str = None):
+        """Drop least recently used entries, with their side files (truth tables), over ``max_bytes``."""
+        groups: Dict[str, list] = {}
+        for name in os.listdir(self.path):
+            if not name.endswith(".tmp"):
+                try:
+                    st = os.stat(os.path.join(self.path, name))
+                except FileNotFoundError:  # another process evicted it meanwhile
+                    continue
+                g = groups.setdefault(name.split(".")[0], [0.0, 0, []])
+                g[0], g[1] = max(g[0], st.st_mtime), g[1] + st.st_size
+                g[2].append(name)
+        total = sum(g[1] for g in groups.values())
+        for key, (_, size, names) in sorted(groups.items(), key=lambda kv: kv[1][0]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            for name in names:
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except FileNotFoundError:
+                    pass
+            total -= size
+            self.evictions += 1
+
+    def load(self, path: str, level: int = 0, window: int = 64) -> FlowProgram:
+        """Compiled program for the JSON / JSON Lines gate list at ``path``."""
+        return self.entry(path, level, window)[1]
+
+    def lookup(self, path: str, level: int = 0, window: int = 64) -> Tuple[str, Optional[FlowProgram]]:
+        """(cache key, mapped program or None on a miss) for the gate list at ``path``."""
+        with open(path, "rb") as f:
+            key = self.key(f.read(), level, window)
+        return key, self.get(key)
+
+    def compile(self, path: str, key: str, level: int = 0, window: int = 64) -> Tuple[FlowProgram, Dict]:
+        """Compile the gate list at ``path`` and store it under ``key`` (after a :meth:`lookup` miss).
+
+        Returns (program, stats) with stats as from :func:`optimize_program`.
+        """
+        gates = iter_jsonl(path) if path.endswith(".jsonl") else load_json(path)
+        if level == 0:
+            # nothing to optimize: stream FLOWs into the cache file and map it
+            count = self.put(key, compile_iter(gates))
+            return load_binary(self.file(key)), {"ops_in": count, "noops": 0, "cancelled": 0, "ops_out": count}
+        prog, stats = optimize_program(compile_flows(gates), level, window)
+        self.put(key, prog)
+        return prog, stats
+
+    def entry(self, path: str, level: int = 0, window: int = 64) -> Tuple[str, FlowProgram]:
+        """(cache file, compiled program) for ``path``, compiling on a miss.
+
+        Side files derived from the program (e.g. truth tables) may be stored
+        as ``<cache file>.*`` and are evicted together with it.
+        """
+        key, prog = self.lookup(path, level, window)
+        if prog is None:
+            prog, _ = self.compile(path, key, level, window)
+        return self.file(key), prog
@@ -1,82 +1,557 @@
+from __future__ import annotations
+
+import json, os, tempfile, weakref
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
 import numpy as np
-import qutip as qt
-from typing import List, Dict
+from typing import List, Dict, Tuple
+
+from bh_core.flowfile import iter_program
+from bh_core.lazy import LazyModule
+from bh_core.op_cache import FLOW_CACHE, OperatorCache
+from bh_core.program import FlowProgram
+from bh_core.permutation import (
+    check_flow, check_perm, apply_flow, flow_permutation, block_permutation, invert_table,
+    gather_rows, permute_density,
+)
+
+__all__ = ["DeltaComputer", "FLOW_BACKENDS", "MODES"]
+
+# only Qobj views and the dense/sparse reference backends need these
+qt = LazyModule("qutip")
+sp = LazyModule("scipy.sparse")
 
-__all__ = ["DeltaComputer"]
+FLOW_BACKENDS = ("perm", "dense", "sparse")
+MODES = ("auto", "density", "statevector")
+# below this many state entries thread hand-off costs more than the gather
+PARALLEL_MIN_SIZE = 1 << 16
+# entries per streaming pass over a memory-mapped state
+STREAM_CHUNK = 1 << 20
+# density entries per sparse-product block: bounds temporaries to ~1 MiB
+SPARSE_CHUNK = 1 << 16
+# a full index array is built and cached only if this many fit in the operator
+# cache; otherwise (and out of core) indices are computed per block
+INDEX_CACHE_SHARE = 16
 
 
 def _build_flow_unitary(n: int, ctrl: int, t1: int, t2: int) -> qt.Qobj:
     """(Anti)-controlled SWAP: swap t1,t2 iff ctrl qubit is |0>.
-    Works for any n≥3 with ctrl<t1<t2.
+    Works for any n≥3 and any three distinct qubits.
     """
     dim = 2 ** n
     U = np.zeros((dim, dim), dtype=complex)
-    for col in range(dim):
-        bits = [(col >> (n - 1 - k)) & 1 for k in range(n)]
-        if bits[ctrl] == 0:
-            bits[t1], bits[t2] = bits[t2], bits[t1]
-        row = 0
-        for b in bits:
-            row = (row << 1) | b
-        U[row, col] = 1.0
+    U[flow_permutation(n, ctrl, t1, t2), np.arange(dim)] = 1.0
     return qt.Qobj(U, dims=[[2] * n, [2] * n])
 
 
+def _build_flow_sparse(n: int, ctrl: int, t1: int, t2: int) -> sp.csr_matrix:
+    """FLOW unitary as a SciPy CSR matrix: one nonzero per column, O(2^n) memory."""
+    dim = 2 ** n
+    return sp.csr_matrix((np.ones(dim), (flow_permutation(n, ctrl, t1, t2), np.arange(dim))), shape=(dim, dim))
+
+
+def _entropies(rdms: np.ndarray) -> np.ndarray:
+    """Von Neumann entropies (natural log, as ``qt.entropy_vn``) of stacked density matrices."""
+    vals = np.linalg.eigvalsh(rdms)
+    vals = np.where(vals > 1e-15, vals, 1.0)  # zero eigenvalues contribute 1·log 1 = 0
+    return -np.sum(vals * np.log(vals), axis=-1)
+
+
+def _pair_rdms(state: np.ndarray, n: int, pairs: List[Tuple[int, int]], pure: bool) -> np.ndarray:
+    """Two-qubit reduced density matrices for ``pairs``, stacked as (P, 4, 4).
+
+    Works on reshaped views of the ket / density matrix: a pair costs O(2^n)
+    instead of a full ``ptrace`` walk over the state.
+    """
+    out = np.empty((len(pairs), 4, 4), dtype=complex)
+    t = state.reshape([2] * (n if pure else 2 * n))
+    rows = list(range(n))
+    for k, (i, j) in enumerate(pairs):
+        if pure:
+            m = np.moveaxis(t, (i, j), (0, 1)).reshape(4, -1)
+            out[k] = m @ m.conj().T
+        else:
+            # repeated row/column labels trace every other qubit out
+            cols = [n + q if q in (i, j) else q for q in rows]
+            out[k] = np.einsum(t, rows + cols, [i, j, n + i, n + j]).reshape(4, 4)
+    return out
+
+
+def _remove_files(paths: set):
+    """Delete the memmap buffers in ``paths`` (close() and garbage-collection hook)."""
+    while paths:
+        try:
+            os.remove(paths.pop())
+        except FileNotFoundError:
+            pass
+
+
+def _as_ket(state: qt.Qobj):
+    """Return ``state`` as a ket if it is pure, else None."""
+    if state.isket:
+        return state
+    vals, vecs = state.eigenstates()
+    if vals[-1] > 1 - 1e-12:
+        return vecs[-1]
+    return None
+
+
 class DeltaComputer:
-    """Minimal reversible Δ-Kernel simulator on arbitrary number of qubits."""
+    """Minimal reversible Δ-Kernel simulator on arbitrary number of qubits.
+
+    ``mode`` selects the state representation: ``"density"`` keeps ``rho``,
+    ``"statevector"`` keeps a 2^n ket ``psi`` (16·2^n bytes instead of
+    16·4^n), ``"auto"`` starts as a statevector and switches to a density
+    matrix the first time a mixed state is accreted.
+
+    ``flow_backend`` selects how FLOW is applied in density mode: ``"perm"``
+    permutes rows and columns of ``rho`` (O(4^n)), ``"sparse"`` applies a CSR
+    unitary with blocked sparse-dense products into the scratch buffer
+    (O(2^n) operator memory), ``"dense"`` multiplies by the full unitary
+    (O(8^n), kept as a reference path).  In statevector mode FLOW is always a
+    permutation of amplitudes.
+
+    The state lives in one NumPy buffer plus one scratch buffer of the same
+    size; permutations gather into the scratch buffer and swap the two, so
+    memory stays flat over a program of any length.  ``psi`` and ``rho`` are
+    built as qutip ``Qobj`` copies only when requested.
+
+    ``threads`` > 1 splits each permutation into index blocks gathered on a
+    thread pool (``0`` = one thread per CPU); NumPy releases the GIL inside
+    the gather, so large registers use several cores.
+
+    ``storage`` (a directory) keeps both buffers in ``numpy.memmap`` files so
+    the state may exceed RAM; permutations then run in ``STREAM_CHUNK``-sized
+    passes and pure-state FLOW indices are computed per chunk instead of
+    cached.  ``checkpoint``/``restore`` save and resume long runs.
+
+    FLOW operators are built lazily and kept in ``cache`` (the process-wide
+    ``FLOW_CACHE`` by default).  Index arrays too large to share the cache
+    with ``INDEX_CACHE_SHARE`` others are never built: their indices are
+    computed per block during the gather.  ``ent_matrix`` results are cached
+    too and only pairs involving qubits touched since the last call are
+    recomputed.
+    """
 
-    def __init__(self, num_qubits: int = 0):
-        self.num_qubits = num_qubits
-        self.rho: qt.Qobj
+    def __init__(self, num_qubits: int = 0, flow_backend: str = "perm", mode: str = "auto",
+                 cache: OperatorCache = None, threads: int = 1, storage: str = None):
+        if flow_backend not in FLOW_BACKENDS:
+            raise ValueError(f"Unknown flow backend {flow_backend!r}")
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode {mode!r}")
+        self.flow_backend = flow_backend
+        self.cache = FLOW_CACHE if cache is None else cache
+        self.mode = mode
+        self.threads = threads or os.cpu_count() or 1
+        self._pool = ThreadPoolExecutor(self.threads) if self.threads > 1 else None
+        self.storage = storage
+        self._files = set()  # memmap buffers created under storage
+        if storage is not None:
+            os.makedirs(storage, exist_ok=True)
+            # buffers outlive neither close() nor the computer itself
+            self._finalizer = weakref.finalize(self, _remove_files, self._files)
+        self.num_qubits = 0
+        self._data: np.ndarray = None  # ket vector (pure) or density matrix
+        self._scratch: np.ndarray = None  # gather target, swapped with _data
+        self._ent: np.ndarray = None  # cached ent_matrix, None = recompute all
+        self._ent_dirty = set()  # qubits touched since _ent was computed
         if num_qubits == 0:
-            self.rho = None  # will set on first accrete
+            return  # will set on first accrete
+        dim = 2 ** num_qubits
+        if mode == "density":
+            self._set_state(np.full((dim, dim), 1 / dim, dtype=complex), num_qubits)
         else:
-            plus = (qt.basis(2, 0) + qt.basis(2, 1)).unit().proj()
-            self.rho = qt.tensor([plus for _ in range(num_qubits)])
+            self._set_state(np.full(dim, dim ** -0.5, dtype=complex), num_qubits)
+
+    # ───────────────────────────────────────────── State
+    @property
+    def is_pure(self) -> bool:
+        return self._data is not None and self._data.ndim == 1
+
+    @property
+    def psi(self) -> qt.Qobj:
+        """Ket of the horizon as a ``Qobj`` copy, or None if the state is mixed."""
+        if not self.is_pure:
+            return None
+        n = self.num_qubits
+        return qt.Qobj(self._data.reshape(-1, 1), dims=[[2] * n, [1] * n])
+
+    @property
+    def rho(self) -> qt.Qobj:
+        """Density matrix of the horizon as a ``Qobj`` copy (built from ``psi`` if pure)."""
+        if self._data is None:
+            return None
+        n = self.num_qubits
+        data = np.outer(self._data, self._data.conj()) if self.is_pure else self._data
+        return qt.Qobj(data, dims=[[2] * n, [2] * n])
+
+    @rho.setter
+    def rho(self, value: qt.Qobj):
+        self._ent = None
+        self._set_state(np.array(value.full(), dtype=complex), len(value.dims[0]))
+
+    def _alloc(self, shape) -> np.ndarray:
+        """Zeroed state-sized buffer: in RAM, or a fresh memmap file under ``storage``."""
+        if self.storage is None:
+            return np.zeros(shape, dtype=complex)
+        # unique names: several computers may share one storage directory
+        fd, path = tempfile.mkstemp(dir=self.storage, prefix="buf", suffix=".bin")
+        os.close(fd)
+        path = os.path.abspath(path)  # matches memmap.filename
+        self._files.add(path)
+        return np.memmap(path, dtype=complex, mode="w+", shape=shape)  # new files read as zeros
+
+    def _drop(self, buf: np.ndarray):
+        if isinstance(buf, np.memmap) and buf.filename in self._files:
+            self._files.discard(buf.filename)
+            os.remove(buf.filename)
 
     # ───────────────────────────────────────────── Accretion
+    def _keep_pure(self, pure_input: bool) -> bool:
+        """Whether appending a pure factor keeps the state a statevector."""
+        return pure_input and self.mode != "density" and (self._data is None or self.is_pure)
+
+    def _set_state(self, data: np.ndarray, n: int):
+        """Install ket vector / density matrix ``data`` of ``n`` qubits; new qubits are product factors."""
+        if self.storage is not None and not isinstance(data, np.memmap):
+            buf = self._alloc(data.shape)
+            buf[...] = data
+            data = buf
+        for old in (self._data, self._scratch):
+            if old is not None and old is not data:
+                self._drop(old)
+        self._data, self._scratch = data, None
+        if self._ent is not None:
+            # product factors leave existing pairs unchanged; only new pairs are dirty
+            grow = n - self.num_qubits
+            self._ent = np.pad(self._ent, ((0, grow), (0, grow)))
+            self._ent_dirty.update(range(self.num_qubits, n))
+        self.num_qubits = n
+
+    def _append(self, factor: np.ndarray, m: int):
+        """Tensor an m-qubit product factor (ket vector or density matrix) onto the horizon."""
+        if self._data is None:
+            data = factor
+        elif factor.ndim == 1:
+            data = np.multiply.outer(self._data, factor).ravel()
+        else:
+            old = np.outer(self._data, self._data.conj()) if self.is_pure else self._data
+            data = np.kron(old, factor)
+        self._set_state(data, self.num_qubits + m)
+
     def accrete(self, state: qt.Qobj):
-        """Append single-qubit *density matrix* to horizon."""
-        if state.dims != [[2], [2]]:
-            if state.isket:
-                state = state.proj()
-            else:
+        """Append single-qubit ket or *density matrix* to horizon."""
+        self.accrete_many([state])
+
+    def accrete_many(self, states: List[qt.Qobj]):
+        """Append several single-qubit kets / density matrices in one step.
+
+        The product of the new qubits is written into one buffer with in-place
+        broadcasts, then joined to the horizon with a single allocation.
+        """
+        for state in states:
+            if state.dims not in ([[2], [1]], [[2], [2]]):
                 raise ValueError("State must be single-qubit ket or density matrix")
-        if self.rho is None:
-            self.rho = state
+        kets = [_as_ket(state) for state in states] if self.mode != "density" else [None] * len(states)
+        if self.mode == "statevector" and any(ket is None for ket in kets):
+            raise ValueError("Statevector mode cannot accrete a mixed state")
+        m = len(states)
+        if m == 0:
+            return
+        if self._keep_pure(all(ket is not None for ket in kets)):
+            factor = np.ones(2 ** m, dtype=complex)
+            for k, ket in enumerate(kets):
+                factor.reshape(2 ** k, 2, -1)[...] *= ket.full().reshape(1, 2, 1)
         else:
-            self.rho = qt.tensor(self.rho, state)
-        self.num_qubits += 1
+            factor = np.ones((2 ** m, 2 ** m), dtype=complex)
+            for k, state in enumerate(states):
+                d = (state.proj() if state.isket else state).full()
+                r = 2 ** (m - k - 1)
+                factor.reshape(2 ** k, 2, r, 2 ** k, 2, r)[...] *= d.reshape(1, 2, 1, 1, 2, 1)
+        self._append(factor, m)
+
+    def load_bitstring(self, bits: str):
+        """Append the basis state |bits> without building any intermediate tensor."""
+        if set(bits) - {"0", "1"}:
+            raise ValueError("Input must be bitstring")
+        m, idx = len(bits), int(bits, 2) if bits else 0
+        if m == 0:
+            return
+        M = 2 ** m
+        old = self._data if self._data is not None else np.ones(1, dtype=complex)
+        if self._keep_pure(True):
+            data = self._alloc(old.size * M)
+            data[idx::M] = old
+        else:
+            if old.ndim == 1:
+                old = np.outer(old, old.conj())
+            data = self._alloc((old.shape[0] * M,) * 2)
+            data[idx::M, idx::M] = old
+        self._set_state(data, self.num_qubits + m)
 
     # ───────────────────────────────────────────── Primitive
     def flow(self, ctrl: int, t1: int, t2: int):
-        if not (0 <= ctrl < t1 < t2 < self.num_qubits):
-            raise ValueError("Require ctrl < t1 < t2 within current qubits")
-        U = _build_flow_unitary(self.num_qubits, ctrl, t1, t2)
-        self.rho = U * self.rho * U.dag()
+        check_flow(self.num_qubits, ctrl, t1, t2)
+        self._flow(ctrl, t1, t2)
+
+    def _flow(self, ctrl: int, t1: int, t2: int):
+        self._ent_dirty.update((ctrl, t1, t2))
+        key = (self.num_qubits, ctrl, t1, t2)
+        if not self.is_pure and self.flow_backend == "sparse":
+            self._apply_sparse(self.cache.get(("sparse",) + key, lambda: _build_flow_sparse(*key)))
+            return
+        if not self.is_pure and self.flow_backend == "dense":
+            U = self.cache.get(("dense",) + key, lambda: _build_flow_unitary(*key))
+            n = self.num_qubits
+            rho = qt.Qobj(self._data, dims=[[2] * n, [2] * n], copy=False)
+            self._data[...] = (U * rho * U.dag()).full()
+            return
+        self._gather(self._index(("perm",) + key, lambda: flow_permutation(*key),
+                                 lambda lo, hi: apply_flow(np.arange(lo, hi, dtype=np.intp), *key)))
+
+    def permute(self, qubits: List[int], table: List[int]):
+        """Apply a fused block: basis state ``l`` of ``qubits`` goes to ``table[l]``.
+
+        Always applied as an index permutation, whatever ``flow_backend``.
+        """
+        check_perm(self.num_qubits, qubits, table)
+        self._ent_dirty.update(qubits)
+        n, inv = self.num_qubits, invert_table(table)
+        key = ("perm", n, tuple(qubits), tuple(table))
+        self._gather(self._index(key, lambda: block_permutation(n, qubits, inv),
+                                 lambda lo, hi: block_permutation(n, qubits, inv, np.arange(lo, hi, dtype=np.intp))))
+
+    def apply_channel(self, qubit: int, kraus: List[np.ndarray], rng: np.random.Generator = None):
+        """Apply the single-qubit channel with Kraus operators ``kraus`` (Σ K†K = I).
+
+        A density matrix evolves exactly, rho -> Σ K rho K†.  A statevector
+        with ``rng`` follows one Monte Carlo trajectory: branch k is sampled
+        with probability ||K_k psi||² and psi -> K_k psi / norm.  Without
+        ``rng`` a pure state is promoted to a density matrix (``auto`` mode).
+        """
+        n = self.num_qubits
+        if not 0 <= qubit < n:
+            raise ValueError("Channel qubit outside current qubits")
+        a, b = 2 ** qubit, 2 ** (n - qubit - 1)
+        self._ent_dirty.add(qubit)
+        if self.is_pure and rng is not None:
+            t = self._data.reshape(a, 2, b)
+            t0, t1 = t[:, 0, :], t[:, 1, :]
+            w0, w1, c = np.vdot(t0, t0).real, np.vdot(t1, t1).real, np.vdot(t0, t1)
+            probs = []
+            for K in kraus:
+                M = K.conj().T @ K
+                probs.append(M[0, 0].real * w0 + M[1, 1].real * w1 + 2 * (M[0, 1] * c).real)
+            cum = np.cumsum(np.clip(probs, 0, None))
+            k = min(int(np.searchsorted(cum, rng.random() * cum[-1], side="right")), len(kraus) - 1)
+            K = kraus[k]
+            new0 = K[0, 0] * t0 + K[0, 1] * t1
+            t1[...] = K[1, 0] * t0 + K[1, 1] * t1
+            t0[...] = new0
+            self._data /= np.sqrt(probs[k])
+            self._ent = None  # renormalizing can change pairs not involving ``qubit``
+            return
+        if self.is_pure:
+            if self.mode == "statevector":
+                raise ValueError("statevector mode samples channels: pass an rng")
+            self._set_state(np.outer(self._data, self._data.conj()), n)
+        t = self._data.reshape(a, 2, b, a, 2, b)
+        out = sum(np.einsum("ij,xjyzkw,lk->xiyzlw", K, t, K.conj()) for K in kraus)
+        self._data[...] = out.reshape(self._data.shape)
+
+    def _apply_sparse(self, U):
+        """``rho -> U rho U†`` for a CSR ``U``, through ``_scratch`` in blocks of ~``SPARSE_CHUNK`` entries.
+
+        Columns of ``U rho`` go into the scratch buffer, then rows of
+        ``(U rho) U†`` back into ``rho``: only block-sized temporaries.
+        """
+        if self._scratch is None:
+            self._scratch = self._alloc(self._data.shape)
+        rho, out = self._data, self._scratch
+        Uh = U.conj().T
+        step = max(1, SPARSE_CHUNK // rho.shape[0])
+        for lo in range(0, rho.shape[0], step):
+            out[:, lo:lo + step] = U @ rho[:, lo:lo + step]
+        for lo in range(0, rho.shape[0], step):
+            rho[lo:lo + step] = out[lo:lo + step] @ Uh
+
+    def _index(self, key, build, block):
+        """Cached gather array for ``key`` if it is (or cheaply can be) cached, else ``block``.
+
+        Large registers would miss the cache on most instructions and
+        allocate a fresh 2^n index each time; they gather through the
+        ``(lo, hi)`` callable ``block`` instead, as out-of-core states do.
+        """
+        if key in self.cache:
+            return self.cache.get(key, build)
+        if self.storage is not None and self.is_pure:
+            return block
+        if np.dtype(np.intp).itemsize << self.num_qubits > self.cache.max_bytes // INDEX_CACHE_SHARE:
+            return block
+        return self.cache.get(key, build)
+
+    def _gather(self, gather):
+        """New state index ``i`` takes the old entry at ``gather[i]`` – no allocation.
+
+        ``gather`` is an index array or a ``(lo, hi) -> gather[lo:hi]`` callable.
+        """
+        if self._scratch is None:
+            self._scratch = self._alloc(self._data.shape)
+        pool = self._pool if self._data.size >= PARALLEL_MIN_SIZE else None
+        parts = self.threads
+        if self.storage is not None:
+            rows = self._data.shape[0]
+            parts = min(rows, max(parts, -(-self._data.size // STREAM_CHUNK)))
+        if self.is_pure:
+            gather_rows(self._data, gather, self._scratch, pool, parts)
+            self._data, self._scratch = self._scratch, self._data
+        else:
+            permute_density(self._data, gather, self._scratch, pool, parts)
+
+    def close(self):
+        """Shut down the FLOW thread pool and delete memmap buffers under ``storage``.
+
+        With ``storage`` the state is released, so the computer is not usable
+        afterwards.
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._files:
+            self._data = self._scratch = None
+            _remove_files(self._files)
+
+    # ───────────────────────────────────────────── Checkpoints
+    def checkpoint(self, path: str, step: int = 0, tag: Dict = None):
+        """Save the state and ``step`` (instructions done) to directory ``path``.
+
+        The state file is written first and ``meta.json`` is replaced
+        atomically afterwards, so an interrupted save leaves the previous
+        checkpoint intact.  ``tag`` (e.g. program hash and input) is stored
+        in ``meta.json`` so :meth:`restore` can refuse a different run's state.
+        """
+        os.makedirs(path, exist_ok=True)
+        name = f"state-{step}.npy"
+        with open(os.path.join(path, name + ".tmp"), "wb") as f:
+            np.save(f, self._data)
+        os.replace(os.path.join(path, name + ".tmp"), os.path.join(path, name))
+        meta = {"num_qubits": self.num_qubits, "mode": self.mode,
+                "flow_backend": self.flow_backend, "step": step, "state": name, "tag": tag}
+        with open(os.path.join(path, "meta.json.tmp"), "w") as f:
+            json.dump(meta, f)
+        os.replace(os.path.join(path, "meta.json.tmp"), os.path.join(path, "meta.json"))
+        for old in os.listdir(path):
+            if old.startswith("state-") and old != name:
+                os.remove(os.path.join(path, old))
+
+    @classmethod
+    def restore(cls, path: str, tag: Dict = None, **kwargs) -> Tuple["DeltaComputer", int]:
+        """Rebuild a computer from :meth:`checkpoint`; returns ``(computer, step)``.
+
+        With ``tag``, a checkpoint saved under a different tag is refused.
+        """
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if tag is not None and meta.get("tag") != tag:
+            raise ValueError(f"Checkpoint in {path} belongs to a different program or input")
+        comp = cls(mode=meta["mode"], flow_backend=meta["flow_backend"], **kwargs)
+        saved = np.load(os.path.join(path, meta["state"]), mmap_mode="r")
+        data = comp._alloc(saved.shape)
+        data[...] = saved
+        comp._set_state(data, meta["num_qubits"])
+        return comp, meta["step"]
+
+    @staticmethod
+    def clear_checkpoint(path: str):
+        """Remove the checkpoint files in ``path`` (e.g. once the run has finished)."""
+        if not os.path.isdir(path):
+            return
+        for name in os.listdir(path):
+            if name.startswith(("state-", "meta.json")):
+                os.remove(os.path.join(path, name))
 
     # ───────────────────────────────────────────── Program execution
-    def execute(self, program: List[Dict]):
-        """Execute compiled list of {'op':'FLOW','ctrl':..,'t1':..,'t2':..}."""
-        for inst in program:
-            if inst["op"] != "FLOW":
+    def execute(self, program: List[Dict], start: int = 0, checkpoint: str = None, every: int = 0,
+                noise=None, rng: np.random.Generator = None, tag: Dict = None):
+        """Execute compiled list of {'op':'FLOW','ctrl':..,'t1':..,'t2':..}.
+
+        Fused {'op':'PERM','qubits':[..],'table':[..]} blocks, ``(ctrl, t1, t2)``
+        tuples and (k, 3) arrays such as a mapped binary program are accepted
+        too.  ``start`` skips instructions already done (resuming from a
+        checkpoint); with ``checkpoint`` and ``every`` the state is saved every
+        ``every`` instructions, under ``tag``.  A ``FlowProgram`` is validated once up front
+        rather than per instruction.  With a ``noise`` model (see
+        ``bh_core.noise``) its channels hit every qubit an instruction touches,
+        sampled with ``rng`` on statevectors (see :meth:`apply_channel`).
+        """
+        channels = noise.channels if noise is not None else ()
+        flow, insts = self.flow, islice(iter_program(program), start, None)
+        if isinstance(program, np.ndarray):
+            program = FlowProgram(program)
+        if isinstance(program, FlowProgram):
+            program.check(self.num_qubits)
+            flow, insts = self._flow, iter(program[start:])
+        for step, inst in enumerate(insts, start + 1):
+            if isinstance(inst, tuple):
+                flow(*inst)
+                touched = inst
+            elif inst["op"] == "FLOW":
+                touched = inst["ctrl"], inst["t1"], inst["t2"]
+                self.flow(*touched)
+            elif inst["op"] == "PERM":
+                touched = inst["qubits"]
+                self.permute(inst["qubits"], inst["table"])
+            else:
                 raise ValueError("Program must be pre-compiled to FLOW ops")
-            self.flow(inst["ctrl"], inst["t1"], inst["t2"])
+            for kraus in channels:
+                for q in touched:
+                    self.apply_channel(q, kraus, rng)
+            if checkpoint is not None and every and step % every == 0:
+                self.checkpoint(checkpoint, step, tag)
 
     # ───────────────────────────────────────────── Observables
-    def measure_z(self, qubit: int = 0) -> float:
-        if self.rho is None:
+    def probabilities(self) -> np.ndarray:
+        """Computational-basis probabilities: |psi|^2 or the diagonal of rho."""
+        if self._data is None:
             raise RuntimeError("No state loaded")
-        Z = qt.sigmaz()
-        return qt.expect(Z, self.rho.ptrace(qubit))
+        if self.is_pure:
+            return np.abs(self._data) ** 2
+        return np.real(np.diagonal(self._data))
+
+    def marginal_probabilities(self) -> np.ndarray:
+        """(n, 2) array of P(qubit = 0), P(qubit = 1) for every qubit."""
+        t = self.probabilities().reshape([2] * self.num_qubits)
+        axes = tuple(range(self.num_qubits))
+        return np.array([t.sum(axis=axes[:q] + axes[q + 1:]) for q in axes])
+
+    def measure_all_z(self) -> np.ndarray:
+        """⟨Z⟩ of every qubit from one read of the basis probabilities."""
+        m = self.marginal_probabilities()
+        return m[:, 0] - m[:, 1]
+
+    def measure_z(self, qubit: int = 0) -> float:
+        p0, p1 = self.probabilities().reshape(2 ** qubit, 2, -1).sum(axis=(0, 2))
+        return float(p0 - p1)
 
     def ent_matrix(self) -> np.ndarray:
-        m = np.zeros((self.num_qubits, self.num_qubits))
-        for i in range(self.num_qubits):
-            for j in range(i + 1, self.num_qubits):
-                ent = qt.entropy_vn(self.rho.ptrace([i, j]))
-                m[i, j] = m[j, i] = ent
-        return m
+        """Pairwise two-qubit entropies S(ρ_ij), recomputing only dirty pairs."""
+        n = self.num_qubits
+        if self._ent is None:
+            self._ent, dirty = np.zeros((n, n)), set(range(n))
+        else:
+            dirty = self._ent_dirty
+        pairs = [(i, j) for i in range(n) for j in range(i + 1, n) if i in dirty or j in dirty]
+        if pairs:
+            ents = _entropies(_pair_rdms(self._data, n, pairs, pure=self.is_pure))
+            i, j = np.array(pairs).T
+            self._ent[i, j] = self._ent[j, i] = ents
+        self._ent_dirty = set()
+        return self._ent.copy()
 
     def trace_norm(self) -> float:
-        return abs(self.rho.tr()) if self.rho is not None else 0.0 
\ No newline at end of file
+        if self._data is None:
+            return 0.0
+        if self.is_pure:
+            return float(np.vdot(self._data, self._data).real)
+        return abs(np.trace(self._data))
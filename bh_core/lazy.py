@@ -0,0 +1,28 @@
+"""Deferred imports for heavy dependencies.
+
+``qt = LazyModule("qutip")`` binds a name at import time but loads qutip only
+when an attribute is first used, so code paths that never build a ``Qobj``
+(the permutation backends, the bit kernel, CLI startup) never pay for it.
+"""
+import importlib
+
+__all__ = ["LazyModule"]
+
+
+class LazyModule:
+    """Module proxy that imports ``name`` on first attribute access."""
+
+    __slots__ = ("_name", "_module")
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr: str):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
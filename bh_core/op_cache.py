@@ -0,0 +1,81 @@
+"""Bounded LRU cache for FLOW operators.
+
+Operators are built lazily on first use and keyed by
+``(kind, num_qubits, ctrl, t1, t2)`` so repeated gates – e.g. the first and
+third FLOW of a compiled TOFF – reuse the same permutation array or unitary.
+"""
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+__all__ = ["OperatorCache", "FLOW_CACHE"]
+
+
+def _nbytes(value) -> int:
+    """Approximate memory held by a cached operator."""
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value)
+    if hasattr(value, "nbytes"):  # numpy arrays
+        return int(value.nbytes)
+    if hasattr(value, "indptr"):  # scipy sparse
+        return int(value.data.nbytes + value.indices.nbytes + value.indptr.nbytes)
+    data = getattr(value, "data", None)  # qutip Qobj
+    if hasattr(data, "as_ndarray"):
+        return int(data.as_ndarray().nbytes)
+    if hasattr(data, "as_scipy"):
+        return _nbytes(data.as_scipy())
+    return 0
+
+
+class OperatorCache:
+    """LRU mapping key → operator, bounded by total ``max_bytes``."""
+
+    def __init__(self, max_bytes: int = 256 << 20):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = self.misses = self.evictions = 0
+        self._items = OrderedDict()
+
+    def get(self, key: Hashable, build: Callable):
+        """Return cached operator for ``key``, building it with ``build()`` on a miss."""
+        try:
+            value, _ = self._items[key]
+        except KeyError:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._items.move_to_end(key)
+            return value
+        value = build()
+        size = _nbytes(value)
+        if size <= self.max_bytes:
+            self._items[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, old) = self._items.popitem(last=False)
+                self.nbytes -= old
+                self.evictions += 1
+        return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._items
+
+    def clear(self):
+        self._items.clear()
+        self.nbytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._items),
+            "nbytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+# process-wide cache shared by all DeltaComputer instances by default
+FLOW_CACHE = OperatorCache()
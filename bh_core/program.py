@@ -0,0 +1,99 @@
+"""Struct-of-arrays representation of compiled FLOW programs.
+
+A ``FlowProgram`` holds one (k, 3) int32 array whose columns are ctrl, t1
+and t2, instead of k dicts.  It slices and concatenates like a sequence,
+iterates as ``(ctrl, t1, t2)`` tuples, validates in one vectorized pass, and
+can wrap a memory-mapped binary program without copying.
+"""
+from typing import Dict, Iterable, Iterator, List
+
+import numpy as np
+
+__all__ = ["FlowProgram"]
+
+# rows converted to Python ints per step while iterating
+ITER_CHUNK = 1 << 16
+
+
+class FlowProgram:
+    """Compiled FLOW program backed by an int32 (k, 3) array."""
+
+    __slots__ = ("rows",)
+
+    def __init__(self, rows=None):
+        if rows is None:
+            rows = np.zeros((0, 3), dtype=np.int32)
+        rows = np.asanyarray(rows)  # keeps memmaps and views zero-copy
+        if rows.dtype != np.int32:
+            rows = rows.astype(np.int32)
+        self.rows = rows.reshape(-1, 3)
+
+    @classmethod
+    def from_flows(cls, program: Iterable) -> "FlowProgram":
+        """Build from {'op':'FLOW',...} dicts or ``(ctrl, t1, t2)`` tuples."""
+        if isinstance(program, FlowProgram):
+            return program
+        rows = []
+        for inst in program:
+            if isinstance(inst, tuple):
+                rows.append(inst)
+            elif inst["op"] == "FLOW":
+                rows.append((inst["ctrl"], inst["t1"], inst["t2"]))
+            else:
+                raise ValueError("FlowProgram holds FLOW ops only")
+        return cls(np.array(rows, dtype=np.int32))
+
+    @classmethod
+    def concat(cls, programs: Iterable["FlowProgram"]) -> "FlowProgram":
+        return cls(np.concatenate([p.rows for p in programs] or [np.zeros((0, 3), np.int32)]))
+
+    # ───────────────────────────────────────────── Columns
+    @property
+    def ctrl(self) -> np.ndarray:
+        return self.rows[:, 0]
+
+    @property
+    def t1(self) -> np.ndarray:
+        return self.rows[:, 1]
+
+    @property
+    def t2(self) -> np.ndarray:
+        return self.rows[:, 2]
+
+    def num_qubits(self) -> int:
+        """Smallest register the program fits in."""
+        return int(self.rows.max()) + 1 if len(self) else 0
+
+    def check(self, n: int):
+        """Vectorized ``check_flow`` over every instruction."""
+        c, a, b = self.ctrl, self.t1, self.t2
+        if len(self) and ((c == a) | (c == b) | (a == b)).any():
+            raise ValueError("Require distinct ctrl, t1, t2 within current qubits")
+        if len(self) and (self.rows.min() < 0 or self.rows.max() >= n):
+            raise ValueError("Require distinct ctrl, t1, t2 within current qubits")
+
+    # ───────────────────────────────────────────── Sequence protocol
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return FlowProgram(self.rows[item])
+        return tuple(int(v) for v in self.rows[item])
+
+    def __iter__(self) -> Iterator[tuple]:
+        for lo in range(0, len(self.rows), ITER_CHUNK):
+            yield from map(tuple, self.rows[lo:lo + ITER_CHUNK].tolist())
+
+    def __add__(self, other: "FlowProgram") -> "FlowProgram":
+        return FlowProgram.concat([self, FlowProgram.from_flows(other)])
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, FlowProgram) and np.array_equal(self.rows, other.rows)
+
+    def __repr__(self) -> str:
+        return f"FlowProgram({len(self)} FLOWs)"
+
+    def to_flows(self) -> List[Dict]:
+        """Expand into {'op':'FLOW',...} dicts."""
+        return [{"op": "FLOW", "ctrl": c, "t1": a, "t2": b} for c, a, b in self]
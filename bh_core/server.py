@@ -0,0 +1,201 @@
+"""Long-running simulator server speaking JSON Lines over a local socket.
+
+Start it with ``python -m bh_core.server --socket /tmp/bh.sock`` (or
+``--port 8765`` for localhost TCP).  Every request is one JSON object per
+line and gets one JSON reply line; a connection may pipeline requests and
+many connections are served concurrently.
+
+    {"op": "load", "program": [gates...], "opt_level": 1}   -> {"ok": true, "hash": "..", "gates": k}
+    {"op": "load", "path": "prog.json"}                     (JSON, .jsonl or binary program file)
+    {"op": "run", "hash": "..", "input": "0101"}            -> {"ok": true, "output": "..", "metrics": {..}}
+    {"op": "run", "hash": "..", "inputs": ["01", ..], "backend": "statevector"}
+    {"op": "stats"}
+
+Compiled programs live in an LRU keyed by content hash and the FLOW
+operator cache stays warm across requests, so a run costs only accretion,
+execution and readout.  ``metrics`` reports queue, execute and total
+latency in microseconds.
+"""
+import argparse, asyncio, json, os, time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from bh_core.batch import run_batch
+from bh_core.bit_kernel import BitComputer
+from bh_core.compiler import ProgramCache, compile_flows, iter_jsonl, load_json, optimize_program
+from bh_core.delta_kernel import DeltaComputer
+from bh_core.flowfile import is_binary, load_binary
+from bh_core.op_cache import FLOW_CACHE
+
+__all__ = ["SimulatorServer", "BACKENDS"]
+
+BACKENDS = ("auto", "bits", "statevector", "density")
+
+
+def _us(t0: int, t1: int) -> float:
+    return (t1 - t0) / 1000
+
+
+class SimulatorServer:
+    """Request handler holding an LRU of compiled programs."""
+
+    def __init__(self, max_programs: int = 64):
+        self.max_programs = max_programs
+        self.programs: "OrderedDict[str, object]" = OrderedDict()
+        self.requests = self.errors = 0
+        # one worker: the shared FLOW operator cache is not thread-safe
+        self._pool = ThreadPoolExecutor(max_workers=1)
+        # bits runs and compiles share no state, so any number may run at once
+        self._workers = ThreadPoolExecutor()
+
+    # ───────────────────────────────────────────── Program LRU
+    @staticmethod
+    def key(gates: List[Dict] = None, path: str = None, opt_level: int = 0) -> str:
+        if path is not None:
+            with open(path, "rb") as f:
+                source = f.read()
+        else:
+            source = json.dumps(gates, sort_keys=True, separators=(",", ":")).encode()
+        return ProgramCache.key(source, opt_level)
+
+    @staticmethod
+    def compile(gates: List[Dict] = None, path: str = None, opt_level: int = 0):
+        if path is not None and is_binary(path):
+            prog = load_binary(path)
+        else:
+            if path is not None:
+                gates = list(iter_jsonl(path)) if path.endswith(".jsonl") else load_json(path)
+            prog = compile_flows(gates)
+        return optimize_program(prog, opt_level)[0]
+
+    async def load(self, gates: List[Dict] = None, path: str = None, opt_level: int = 0) -> str:
+        """Compile a gate list (or program file) once; returns its content hash.
+
+        Hashing and compiling run on the worker pool, off the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        key = await loop.run_in_executor(self._workers, self.key, gates, path, opt_level)
+        if key in self.programs:
+            self.programs.move_to_end(key)
+            return key
+        prog = await loop.run_in_executor(self._workers, self.compile, gates, path, opt_level)
+        self.programs[key] = prog
+        while len(self.programs) > self.max_programs:
+            self.programs.popitem(last=False)
+        return key
+
+    def program(self, key: str):
+        try:
+            self.programs.move_to_end(key)
+        except KeyError:
+            raise ValueError(f"Unknown program hash {key!r}; send a load request first") from None
+        return self.programs[key]
+
+    # ───────────────────────────────────────────── Execution
+    @staticmethod
+    def evaluate(prog, inputs: List[str], backend: str) -> List[str]:
+        if backend in ("auto", "bits"):
+            if len(inputs) == 1:
+                comp = BitComputer(inputs[0])
+                comp.execute(prog)
+                return [comp.output()]
+            return [out for outs in run_batch(prog, inputs, len(inputs)) for out in outs]
+        outs = []
+        for bits in inputs:
+            comp = DeltaComputer(mode=backend)
+            comp.load_bitstring(bits)
+            comp.execute(prog)
+            outs.append("".join("0" if z > 0 else "1" for z in comp.measure_all_z()))
+        return outs
+
+    async def run(self, msg: Dict, received: int) -> Dict:
+        prog = self.program(msg["hash"])
+        backend = msg.get("backend", "auto")
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}")
+        single = "inputs" not in msg
+        inputs = [msg["input"]] if single else list(msg["inputs"])
+        started = time.perf_counter_ns()
+        # all work runs off the event loop so other clients keep being served;
+        # qutip backends share FLOW_CACHE and go through the single-worker pool
+        pool = self._workers if backend in ("auto", "bits") else self._pool
+        outs = await asyncio.get_running_loop().run_in_executor(pool, self.evaluate, prog, inputs, backend)
+        done = time.perf_counter_ns()
+        reply = {"ok": True, "metrics": {
+            "queue_us": _us(received, started), "execute_us": _us(started, done),
+            "total_us": _us(received, done), "gates": len(prog), "inputs": len(inputs),
+        }}
+        reply["output" if single else "outputs"] = outs[0] if single else outs
+        return reply
+
+    def stats(self) -> Dict:
+        return {"ok": True, "programs": len(self.programs), "max_programs": self.max_programs,
+                "requests": self.requests, "errors": self.errors, "operator_cache": FLOW_CACHE.stats()}
+
+    async def dispatch(self, line: bytes) -> Dict:
+        received = time.perf_counter_ns()
+        self.requests += 1
+        try:
+            msg = json.loads(line)
+            if not isinstance(msg, dict):
+                raise ValueError("Request must be a JSON object")
+            op = msg.get("op", "run")
+            if op == "load":
+                key = await self.load(msg.get("program"), msg.get("path"), msg.get("opt_level", 0))
+                return {"ok": True, "hash": key, "gates": len(self.programs[key]),
+                        "metrics": {"total_us": _us(received, time.perf_counter_ns())}}
+            if op == "run":
+                return await self.run(msg, received)
+            if op == "stats":
+                return self.stats()
+            raise ValueError(f"Unknown op {op!r}")
+        except (ValueError, KeyError, TypeError, OSError, RuntimeError) as exc:
+            self.errors += 1
+            return {"ok": False, "error": str(exc) if not isinstance(exc, KeyError) else f"Missing field {exc}"}
+
+    # ───────────────────────────────────────────── Transport
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    reply = await self.dispatch(line)
+                    writer.write(json.dumps(reply).encode() + b"\n")
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, socket_path: str = None, host: str = "127.0.0.1", port: int = 0):
+        """Serve until cancelled on a Unix socket if ``socket_path`` is given, else on TCP."""
+        if socket_path is not None:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            server = await asyncio.start_unix_server(self.handle, path=socket_path)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def parse() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Black-Hole Δ-Kernel simulator server (JSON Lines)")
+    p.add_argument("--socket", metavar="PATH", help="Unix domain socket to listen on")
+    p.add_argument("--host", default="127.0.0.1", help="TCP host when --socket is not given")
+    p.add_argument("--port", type=int, default=8765, help="TCP port when --socket is not given")
+    p.add_argument("--max-programs", type=int, default=64, help="Compiled programs kept in the LRU")
+    return p.parse_args()
+
+
+def main():
+    args = parse()
+    server = SimulatorServer(args.max_programs)
+    try:
+        asyncio.run(server.serve(args.socket, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
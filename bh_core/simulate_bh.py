@@ -1,46 +1,300 @@
-import argparse, json, sys, subprocess, importlib.util
+import argparse, hashlib, json, os, resource, sys, time
+from collections import deque
+from contextlib import contextmanager
+from itertools import chain, islice
+from multiprocessing import Pool
+from typing import Iterable, Iterator, List
 
-# ensure qutip present even in CI where wheel absent
-if importlib.util.find_spec("qutip") is None:
-    try:
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "qutip==5.2.0", "--quiet", "--break-system-packages"])
-    except Exception:
-        print("qutip unavailable and installation failed", file=sys.stderr)
-        sys.exit(1)
+import numpy as np
 
-import qutip as qt
+# qutip is imported lazily by DeltaComputer, and only if a Qobj is ever needed
 from bh_core.delta_kernel import DeltaComputer
-from bh_core.compiler import compile_program, load_json
+from bh_core.batch import run_batch
+from bh_core.bit_kernel import BitComputer
+from bh_core.compiler import (
+    DEFAULT_CACHE_DIR, OPT_LEVELS, ProgramCache, compile_flows, compile_iter, fuse_flows, iter_jsonl, load_json, optimize_program,
+)
+from bh_core.flowfile import is_binary, load_binary
+from bh_core.truth_table import MAX_TABLE_QUBITS, build_table, load_table, lookup, lookup_many
+
+# "auto" picks the classical bit kernel: bitstring inputs are always basis states
+BACKENDS = ("auto", "bits", "statevector", "density")
+PHASES = ("load", "compile", "accrete", "execute", "readout")
 
 
 def parse() -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Black-Hole Δ-Kernel simulator")
-    p.add_argument("program", help="Path to JSON gate list")
-    p.add_argument("input", help="bitstring input, e.g. 1010")
-    p.add_argument("--steps", type=int, default=1, help="Execute program N times (for benchmark)")
+    p.add_argument("program",
+                   help="JSON gate list, .jsonl gate stream (compiled lazily) or binary FLOW program")
+    p.add_argument("input", nargs="?", help="bitstring input, e.g. 1010")
+    p.add_argument("--inputs", metavar="FILE",
+                   help="Evaluate one bitstring per line of FILE ('-' = stdin), streaming outputs")
+    p.add_argument("--jobs", type=int, default=1, metavar="N",
+                   help="Worker processes for --inputs (outputs stay in input order)")
+    p.add_argument("--chunk", type=int, default=1 << 14, metavar="K",
+                   help="Inputs per unit of work for --inputs")
+    p.add_argument("--steps", type=int, default=1,
+                   help="Benchmark: run accrete/execute/readout N times and report phase timings")
+    p.add_argument("--json", action="store_true",
+                   help="Print a JSON report (phase timings, gates/s, peak RSS, output) instead of the bits")
+    p.add_argument("--backend", choices=BACKENDS, default="auto",
+                   help="Simulator: classical bits (auto) or qutip statevector/density")
+    p.add_argument("-O", "--opt-level", type=int, choices=OPT_LEVELS, default=0,
+                   help="Peephole optimization: 1 = no-ops and adjacent pairs, 2 = + commuting pairs")
+    p.add_argument("--fuse", type=int, default=0, metavar="K",
+                   help="Fuse adjacent FLOWs into block permutations over ≤K qubits (0 = off)")
+    p.add_argument("--table", action="store_true",
+                   help=f"Precompute the program's full truth table (≤{MAX_TABLE_QUBITS} qubits, bits backend), "
+                        "saved next to the compiled program, and answer inputs by lookup")
+    p.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, metavar="DIR",
+                   help="Compiled-program cache (default: $BH_CACHE_DIR or ~/.cache/bh_core)")
+    p.add_argument("--no-cache", action="store_true",
+                   help="Always recompile; .jsonl programs are then streamed without materializing")
+    p.add_argument("--storage", metavar="DIR",
+                   help="Keep the quantum state in memory-mapped files under DIR")
+    p.add_argument("--checkpoint", metavar="DIR",
+                   help="Save/resume the quantum state in DIR (resumes if a checkpoint exists)")
+    p.add_argument("--checkpoint-every", type=int, default=1000, metavar="N",
+                   help="Instructions between checkpoints")
     return p.parse_args()
 
 
-def bit_to_state(b: str) -> qt.Qobj:
-    return qt.basis(2, int(b))
+@contextmanager
+def timed(times: dict, phase: str):
+    """Accumulate wall time spent in ``phase`` into ``times``."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        times[phase] = times.get(phase, 0.0) + time.perf_counter() - t0
+
+
+def print_opt_stats(level: int, stats: dict):
+    print(f"-O{level}: {stats['ops_in']} -> {stats['ops_out']} FLOWs "
+          f"({stats['cancelled']} cancelled, {stats['noops']} no-ops)", file=sys.stderr)
+
+
+def load_program(args, times: dict):
+    """Load, compile, optimize and fuse ``args.program``.
+
+    Returns (program, cache status, compiled program file or None).
+    """
+    cache, program_file = "off", None
+    optimized = False
+    if is_binary(args.program):
+        with timed(times, "load"):
+            prog = load_binary(args.program)
+        program_file = args.program
+    elif not args.no_cache:
+        store = ProgramCache(args.cache_dir)
+        with timed(times, "load"):
+            key, prog = store.lookup(args.program, args.opt_level)
+        if prog is None:
+            with timed(times, "compile"):
+                prog, stats = store.compile(args.program, key, args.opt_level)
+            if args.opt_level:
+                print_opt_stats(args.opt_level, stats)
+        elif args.opt_level:
+            print(f"-O{args.opt_level}: {len(prog)} FLOWs (cached)", file=sys.stderr)
+        program_file, cache, optimized = store.file(key), ("hit" if store.hits else "miss"), True
+    elif args.program.endswith(".jsonl") and not (args.opt_level or args.fuse or args.steps > 1 or args.inputs):
+        # streamed: never holds the program unless it is optimized or replayed
+        prog = compile_iter(iter_jsonl(args.program))
+    else:
+        with timed(times, "load"):
+            gates = list(iter_jsonl(args.program)) if args.program.endswith(".jsonl") else load_json(args.program)
+        with timed(times, "compile"):
+            prog = compile_flows(gates)
+    with timed(times, "compile"):
+        if args.opt_level and not optimized:
+            prog, stats = optimize_program(prog, args.opt_level)
+            print_opt_stats(args.opt_level, stats)
+        if args.fuse:
+            prog, stats = fuse_flows(prog, args.fuse)
+            print(f"fused {stats['fused']} FLOWs into {stats['blocks']} blocks", file=sys.stderr)
+    return prog, cache, program_file
+
+
+def truth_table(prog, program_file: str, n: int, times: dict):
+    """Truth table of ``prog`` on n qubits: mapped from beside ``program_file`` when there is one."""
+    with timed(times, "compile"):
+        return load_table(program_file, prog, n) if program_file else build_table(prog, n)
+
+
+def checkpoint_tag(args, bits: str) -> dict:
+    """Identity of a run, saved with its checkpoints so another run's state is never resumed."""
+    h = hashlib.sha256()
+    with open(args.program, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return {"program": h.hexdigest(), "input": bits, "backend": args.backend,
+            "opt_level": args.opt_level, "fuse": args.fuse}
+
+
+def run(args, prog, bits: str, times: dict, table=None) -> str:
+    """Accrete ``bits``, execute ``prog`` once and read out the output bitstring."""
+    if table is not None:
+        with timed(times, "execute"):
+            return lookup(table, bits)
+    start, tag = 0, None
+    with timed(times, "accrete"):
+        if args.checkpoint:
+            tag = checkpoint_tag(args, bits)
+        if args.backend in ("auto", "bits"):
+            comp = BitComputer(bits)
+        elif args.checkpoint and os.path.exists(os.path.join(args.checkpoint, "meta.json")):
+            try:
+                comp, start = DeltaComputer.restore(args.checkpoint, tag=tag, storage=args.storage)
+            except ValueError as exc:
+                sys.exit(f"{exc}; remove it to start over")
+        else:
+            comp = DeltaComputer(mode=args.backend, storage=args.storage)
+            comp.load_bitstring(bits)
+    with timed(times, "execute"):
+        if isinstance(comp, DeltaComputer):
+            comp.execute(prog, start=start, checkpoint=args.checkpoint, every=args.checkpoint_every, tag=tag)
+            if args.checkpoint:
+                DeltaComputer.clear_checkpoint(args.checkpoint)  # finished: nothing left to resume
+        else:
+            comp.execute(prog)
+    with timed(times, "readout"):
+        out_bits = "".join("0" if z > 0 else "1" for z in comp.measure_all_z())
+    return out_bits
+
+
+def report(args, prog, cache: str, times: dict, out_bits: str) -> dict:
+    gates = len(prog) if hasattr(prog, "__len__") else None
+    execute = times.get("execute", 0.0)
+    return {
+        "program": args.program,
+        "backend": args.backend,
+        "qubits": len(out_bits),
+        "gates": gates,
+        "steps": args.steps,
+        "cache": cache,
+        "seconds": {phase: times.get(phase, 0.0) for phase in PHASES},
+        "total_seconds": sum(times.values()),
+        "gates_per_second": gates * args.steps / execute if gates and execute else None,
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        * (1 if sys.platform == "darwin" else 1024),
+        "output": out_bits,
+    }
+
+
+def evaluate(args, prog, lines: List[str], table=None) -> List[str]:
+    """Outputs for a chunk of inputs, reusing ``prog`` and the warm operator cache."""
+    if table is not None:
+        return lookup_many(table, lines)
+    if args.backend in ("auto", "bits"):
+        # bit-sliced: 64 inputs per machine word
+        return [out for outs in run_batch(prog, lines, len(lines) or 1) for out in outs]
+    for bits in lines:
+        if set(bits) - set("01"):
+            raise ValueError(f"Input must be bitstring: {bits!r}")
+    times: dict = {}
+    return [run(args, prog, bits, times) for bits in lines]
+
+
+_worker = None
+
+
+def _init_worker(args, prog, table):
+    global _worker
+    if isinstance(table, str):  # map the saved table instead of pickling a copy
+        table = np.load(table, mmap_mode="r")
+    _worker = (args, prog, table)
+
+
+def _evaluate_worker(lines: List[str]) -> List[str]:
+    args, prog, table = _worker
+    return evaluate(args, prog, lines, table)
+
+
+def stream_outputs(args, prog, inputs: Iterable[str], table=None) -> Iterator[List[str]]:
+    """Yield output chunks in input order; at most ``2 * jobs`` chunks are in flight."""
+    lines = filter(None, map(str.strip, inputs))
+    chunks = iter(lambda: list(islice(lines, args.chunk)), [])
+    if args.jobs <= 1:
+        for chunk in chunks:
+            yield evaluate(args, prog, chunk, table)
+        return
+    shared = getattr(table, "filename", None) or table
+    # Pool.imap would drain the input eagerly; a bounded window keeps memory flat
+    with Pool(args.jobs, initializer=_init_worker, initargs=(args, prog, shared)) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(_evaluate_worker, (chunk,)))
+            if len(pending) >= 2 * args.jobs:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def main_inputs(args):
+    times: dict = {}
+    prog, _, program_file = load_program(args, times)
+    src = sys.stdin if args.inputs == "-" else open(args.inputs)
+    with src:
+        try:
+            lines, table = filter(None, map(str.strip, src)), None
+            if args.table:
+                first = next(lines, None)
+                if first is None:
+                    return
+                table = truth_table(prog, program_file, len(first), times)
+                lines = chain([first], lines)
+            for outs in stream_outputs(args, prog, lines, table):
+                sys.stdout.write("\n".join(outs) + "\n")
+        except ValueError as exc:
+            sys.exit(str(exc))
 
 
 def main():
     args = parse()
-    gate_list = load_json(args.program)
-    prog = compile_program(gate_list)
-
-    comp = DeltaComputer()
-    # accrete input bits
-    for bit in args.input.strip():
-        if bit not in "01":
-            print("Input must be bitstring", file=sys.stderr)
-            sys.exit(1)
-        comp.accrete(bit_to_state(bit))
-
-    comp.execute(prog)
-    out_bits = "".join("0" if comp.measure_z(i) > 0 else "1" for i in range(comp.num_qubits))
+    if args.steps < 1:
+        sys.exit("--steps must be at least 1")
+    if args.steps > 1 and args.checkpoint:
+        sys.exit("--checkpoint cannot be combined with --steps")
+    if (args.input is None) == (args.inputs is None):
+        sys.exit("Give exactly one of a bitstring input or --inputs FILE")
+    if args.table and args.backend not in ("auto", "bits"):
+        sys.exit("--table needs the bits backend")
+    if (args.storage or args.checkpoint) and args.backend in ("auto", "bits"):
+        sys.exit("--storage and --checkpoint need the statevector or density backend")
+    if args.inputs:
+        if args.checkpoint or args.steps > 1 or args.json:
+            sys.exit("--inputs cannot be combined with --checkpoint, --steps or --json")
+        main_inputs(args)
+        return
+    bits = args.input.strip()
+    if set(bits) - set("01"):
+        print("Input must be bitstring", file=sys.stderr)
+        sys.exit(1)
+
+    times: dict = {}
+    prog, cache, program_file = load_program(args, times)
+    try:
+        table = truth_table(prog, program_file, len(bits), times) if args.table else None
+    except ValueError as exc:
+        sys.exit(str(exc))
+    try:
+        for _ in range(args.steps):
+            out_bits = run(args, prog, bits, times, table)
+    except ValueError as exc:
+        sys.exit(str(exc))
+
+    if args.json:
+        print(json.dumps(report(args, prog, cache, times, out_bits)))
+        return
     print(out_bits)
+    if args.steps > 1:
+        rep = report(args, prog, cache, times, out_bits)
+        for phase, sec in rep["seconds"].items():
+            print(f"{phase:>8}: {sec:10.6f} s", file=sys.stderr)
+        if rep["gates_per_second"]:
+            print(f"{rep['gates_per_second']:.3e} gates/s over {args.steps} runs", file=sys.stderr)
+        print(f"peak RSS {rep['peak_rss_bytes'] / 2**20:.1f} MiB", file=sys.stderr)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,117 @@
+"""Whole-program truth tables for small registers.
+
+On basis inputs a compiled program is a permutation of the 2^n basis
+indices.  For n ≤ ``MAX_TABLE_QUBITS`` that permutation fits in a uint32
+array: ``table[i]`` is the output index for input index ``i`` (qubit 0 is
+the most significant bit, as everywhere else).  It is built once by pushing
+every index through the program in vectorized chunks; afterwards an input
+is answered by a single array lookup.  Tables are saved as ``.npy`` next to
+the compiled program and memory-mapped on load.
+"""
+import os, tempfile
+from typing import List
+
+import numpy as np
+
+from bh_core.flowfile import iter_program
+from bh_core.permutation import block_permutation, check_flow, check_perm
+from bh_core.program import FlowProgram
+
+__all__ = ["MAX_TABLE_QUBITS", "build_table", "table_path", "load_table", "lookup", "lookup_many"]
+
+MAX_TABLE_QUBITS = 24
+# indices pushed through the whole program per pass: small enough to stay in L2
+TABLE_CHUNK = 1 << 16
+
+
+def _flow_inplace(idx: np.ndarray, n: int, ctrl: int, t1: int, t2: int, swap: np.ndarray, tmp: np.ndarray):
+    """``idx = apply_flow(idx, n, ctrl, t1, t2)`` without temporaries."""
+    sc, s1, s2 = (n - 1 - q for q in (ctrl, t1, t2))
+    np.right_shift(idx, s1, out=swap)
+    np.right_shift(idx, s2, out=tmp)
+    swap ^= tmp
+    np.right_shift(idx, sc, out=tmp)
+    np.invert(tmp, out=tmp)
+    swap &= tmp
+    swap &= 1
+    np.left_shift(swap, s1, out=tmp)
+    np.left_shift(swap, s2, out=swap)
+    swap |= tmp
+    idx ^= swap
+
+
+def build_table(program, n: int) -> np.ndarray:
+    """uint32 image of every n-qubit basis index under ``program``."""
+    if not 0 < n <= MAX_TABLE_QUBITS:
+        raise ValueError(f"Truth tables need 1..{MAX_TABLE_QUBITS} qubits, got {n}")
+    if isinstance(program, np.ndarray):
+        program = FlowProgram(program)
+    if isinstance(program, FlowProgram):
+        program.check(n)
+        insts = program.rows.tolist()
+    else:
+        insts = list(iter_program(program))
+    table = np.arange(2 ** n, dtype=np.uint32)
+    size = min(TABLE_CHUNK, table.size)
+    swap, tmp = np.empty(size, dtype=np.uint32), np.empty(size, dtype=np.uint32)
+    for lo in range(0, table.size, size):
+        idx = table[lo:lo + size]
+        for inst in insts:
+            if isinstance(inst, (tuple, list)):
+                if lo == 0 and not isinstance(program, FlowProgram):
+                    check_flow(n, *inst)
+                _flow_inplace(idx, n, *inst, swap, tmp)
+            elif inst["op"] == "FLOW":
+                args = inst["ctrl"], inst["t1"], inst["t2"]
+                if lo == 0:
+                    check_flow(n, *args)
+                _flow_inplace(idx, n, *args, swap, tmp)
+            elif inst["op"] == "PERM":
+                if lo == 0:
+                    check_perm(n, inst["qubits"], inst["table"])
+                idx[:] = block_permutation(n, inst["qubits"], inst["table"], idx.astype(np.intp))
+            else:
+                raise ValueError("Program must be pre-compiled to FLOW ops")
+    return table
+
+
+def table_path(program_file: str, n: int) -> str:
+    """Where the n-qubit table of the compiled program ``program_file`` is kept."""
+    return f"{program_file}.{n}q.npy"
+
+
+def load_table(program_file: str, program, n: int) -> np.ndarray:
+    """Memory-map the saved table for ``program_file``, building it first if missing or stale."""
+    path = table_path(program_file, n)
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(program_file):
+        table = build_table(program, n)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, table)
+        os.replace(tmp, path)
+    return np.load(path, mmap_mode="r")
+
+
+def lookup(table: np.ndarray, bits: str) -> str:
+    n = len(bits)
+    if table.size != 2 ** n or set(bits) - {"0", "1"}:
+        raise ValueError(f"Input must be a {table.size.bit_length() - 1}-bit bitstring")
+    return format(int(table[int(bits, 2)]), f"0{n}b")
+
+
+def lookup_many(table: np.ndarray, lines: List[str]) -> List[str]:
+    """Vectorized :func:`lookup` for equal-length bitstrings."""
+    if not lines:
+        return []
+    n = table.size.bit_length() - 1
+    if any(len(line) != n for line in lines):
+        raise ValueError(f"All inputs must have {n} bits")
+    raw = np.frombuffer("".join(lines).encode("ascii"), dtype=np.uint8)
+    bits = raw.reshape(len(lines), n) - ord("0")
+    if (bits > 1).any():
+        raise ValueError("Input must be bitstring")
+    shifts = np.arange(n - 1, -1, -1, dtype=np.uint32)
+    out = table[(bits.astype(np.uint32) << shifts).sum(axis=1, dtype=np.uint32)]
+    rows = np.full((len(lines), n + 1), ord("\n"), dtype=np.uint8)
+    rows[:, :-1] = ((out[:, None] >> shifts) & 1) + ord("0")
+    return rows.tobytes().decode("ascii").split("\n")[:-1]
@@ -0,0 +1,15 @@
+# keep the compiled-program cache out of the user's home during tests
+import os, shutil, tempfile
+
+_cache_dir = None
+
+
+def pytest_configure(config):
+    # before test modules import bh_core, so DEFAULT_CACHE_DIR and CLI subprocesses see it
+    global _cache_dir
+    _cache_dir = tempfile.mkdtemp(prefix="bh_cache_")
+    os.environ["BH_CACHE_DIR"] = _cache_dir
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_cache_dir, ignore_errors=True)
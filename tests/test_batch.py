@@ -0,0 +1,42 @@
+# ensure path
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+import random
+
+from bh_core.batch import run_batch
+from bh_core.bit_kernel import BitComputer
+
+
+def test_batch_matches_bit_kernel():
+    rng = random.Random(7)
+    n = 9
+    prog = []
+    for _ in range(30):
+        c, t1, t2 = rng.sample(range(n), 3)
+        prog.append({"op": "FLOW", "ctrl": c, "t1": t1, "t2": t2})
+    inputs = ["".join(rng.choice("01") for _ in range(n)) + "\n" for _ in range(200)]
+    outputs = [o for chunk in run_batch(prog, inputs, chunk=70) for o in chunk]
+    assert len(outputs) == len(inputs)
+    for bits, out in zip(inputs, outputs):
+        comp = BitComputer(bits.strip())
+        comp.execute(prog)
+        assert comp.output() == out
+
+
+def test_mixed_length_inputs_rejected():
+    import pytest
+    with pytest.raises(ValueError):
+        list(run_batch([], ["01", "0", "011"]))
+
+
+def test_batch_runs_fused_perm_blocks():
+    from bh_core.compiler import fuse_flows
+    rng = random.Random(3)
+    n = 7
+    prog = [{"op": "FLOW", "ctrl": c, "t1": t1, "t2": t2} for c, t1, t2 in (rng.sample(range(n), 3) for _ in range(20))]
+    fused, stats = fuse_flows(prog, 4)
+    assert stats["blocks"]
+    inputs = ["".join(rng.choice("01") for _ in range(n)) for _ in range(150)]
+    assert [o for chunk in run_batch(fused, inputs) for o in chunk] == \
+        [o for chunk in run_batch(prog, inputs) for o in chunk]
@@ -0,0 +1,34 @@
+# ensure path
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+import random
+
+import pytest
+
+from bh_core.bit_kernel import BitComputer, basis_bit
+
+
+def test_bits_match_delta_kernel():
+    qt = pytest.importorskip("qutip")
+    from bh_core.delta_kernel import DeltaComputer
+
+    rng = random.Random(3)
+    bits = "".join(rng.choice("01") for _ in range(6))
+    prog = []
+    for _ in range(20):
+        c, t1, t2 = rng.sample(range(6), 3)
+        prog.append({"op": "FLOW", "ctrl": c, "t1": t1, "t2": t2})
+    fast = BitComputer(bits)
+    fast.execute(prog)
+    comp = DeltaComputer()
+    for b in bits:
+        comp.accrete(qt.basis(2, int(b)))
+    comp.execute(prog)
+    assert [fast.measure_z(i) for i in range(6)] == [round(comp.measure_z(i)) for i in range(6)]
+
+
+def test_basis_bit_rejects_non_basis():
+    assert basis_bit("1") == 1
+    with pytest.raises(ValueError):
+        BitComputer().accrete(2)
@@ -8,4 +8,101 @@ from bh_core.compiler import compile_program
 def test_compile_not():
     gates = [{"op":"NOT","target":1}]
     prog = compile_program(gates)
-    assert prog and prog[0]["op"]=="FLOW" 
\ No newline at end of file
+    assert prog and prog[0]["op"]=="FLOW" 
+
+def test_fuse_flows_preserves_program():
+    from bh_core.bit_kernel import BitComputer
+    from bh_core.compiler import fuse_flows
+
+    prog = compile_program([{"op": "NOT", "target": 1}, {"op": "NOT", "target": 2},
+                            {"op": "NOT", "target": 3}, {"op": "NOT", "target": 4}])
+    fused, stats = fuse_flows(prog, max_qubits=4)
+    assert stats["fused"] == 4 and stats["blocks"] == 2
+    for x in range(64):
+        bits = format(x, "06b")
+        a, b = BitComputer(bits), BitComputer(bits)
+        a.execute(prog)
+        b.execute(fused)
+        assert a.output() == b.output()
+
+
+def test_optimize_cancels_commuting_pairs():
+    from bh_core.compiler import optimize_program
+
+    a = {"op": "FLOW", "ctrl": 0, "t1": 1, "t2": 2}
+    b = {"op": "FLOW", "ctrl": 0, "t1": 3, "t2": 4}   # disjoint targets, shares ctrl
+    noop = {"op": "FLOW", "ctrl": 0, "t1": 5, "t2": 5}
+    prog = [a, b, noop, dict(a, t1=2, t2=1), b]
+    out1, s1 = optimize_program(prog, level=1)
+    assert s1["noops"] == 1 and s1["cancelled"] == 0 and len(out1) == 4
+    out2, s2 = optimize_program(prog, level=2)
+    assert out2 == [] and s2["cancelled"] == 4
+    cnot = {"op": "FLOW", "ctrl": 1, "t1": 1, "t2": 2}   # not a permutation: kept
+    assert optimize_program([cnot, cnot], level=2)[0] == [cnot, cnot]
+
+
+def test_compile_iter_streams_jsonl(tmp_path):
+    import json
+    from bh_core.bit_kernel import BitComputer
+    from bh_core.compiler import compile_iter, iter_jsonl
+
+    gates = [{"op": "NOT", "target": 1}, {"op": "TOFF", "c1": 1, "c2": 2, "target": 3}]
+    path = tmp_path / "prog.jsonl"
+    path.write_text("\n".join(json.dumps(g) for g in gates) + "\n\n")
+    stream = compile_iter(iter_jsonl(str(path)))
+    assert next(stream) == compile_program(gates)[0]   # lazy: first FLOW before the rest is read
+    a, b = BitComputer("01100"), BitComputer("01100")
+    a.execute(compile_program(gates))
+    b.execute(compile_iter(iter_jsonl(str(path))))
+    assert a.output() == b.output()
+
+
+def test_program_cache_hits_and_evicts(tmp_path):
+    import json, os
+    from bh_core.compiler import ProgramCache
+    src = tmp_path / "prog.json"
+    json.dump([{"op": "NOT", "target": 1}, {"op": "NOT", "target": 1}, {"op": "NOT", "target": 2}], src.open("w"))
+    cache = ProgramCache(str(tmp_path / "cache"))
+    first = cache.load(str(src), level=1)
+    again = cache.load(str(src), level=1)
+    assert (cache.misses, cache.hits) == (1, 1)
+    assert again == first and again.to_flows() == [{"op": "FLOW", "ctrl": 0, "t1": 2, "t2": 3}]
+    assert len(cache.load(str(src), level=0)) == 3  # opt level is part of the key
+    assert len(os.listdir(cache.path)) == 2
+    small = ProgramCache(cache.path, max_bytes=1)
+    small.load(str(src), level=2)
+    assert small.evictions == 2 and len(os.listdir(cache.path)) == 1
+
+
+def test_program_cache_lookup_then_compile(tmp_path):
+    import json
+    from bh_core.compiler import ProgramCache, iter_jsonl
+    src = tmp_path / "prog.jsonl"
+    src.write_text("\n".join(json.dumps(g) for g in [{"op": "NOT", "target": 1}, {"op": "CNOT", "control": 1, "target": 2}]))
+    cache = ProgramCache(str(tmp_path / "cache"))
+    key, prog = cache.lookup(str(src))
+    assert prog is None and cache.misses == 1
+    compiled, stats = cache.compile(str(src), key)
+    assert stats["ops_in"] == stats["ops_out"] == 2
+    assert compiled.to_flows() == compile_program(list(iter_jsonl(str(src))))
+    assert cache.lookup(str(src)) == (key, compiled) and cache.hits == 1
+    assert cache.entry(str(src)) == (cache.file(key), compiled)
+
+
+def test_program_cache_evict_skips_vanished_entries(tmp_path, monkeypatch):
+    import json, os
+    from bh_core.compiler import ProgramCache
+    src = tmp_path / "prog.json"
+    json.dump([{"op": "NOT", "target": 1}], src.open("w"))
+    cache = ProgramCache(str(tmp_path / "cache"))
+    cache.load(str(src), level=0)
+    cache.load(str(src), level=1)
+    real_remove = os.remove
+
+    def racing_remove(path):  # another process got there first
+        real_remove(path)
+        real_remove(path)
+    monkeypatch.setattr(os, "remove", racing_remove)
+    small = ProgramCache(cache.path, max_bytes=1)
+    small.load(str(src), level=2)
+    assert small.evictions == 2 and len(os.listdir(cache.path)) == 1
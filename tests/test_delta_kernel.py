@@ -1,5 +1,5 @@
 # add repo root to path and ensure qutip present
-import sys, pathlib, subprocess, importlib.util
+import sys, pathlib, os, subprocess, importlib.util
 
 sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
 
@@ -12,6 +12,7 @@ if spec is None:
     except Exception:
         pytest.skip("qutip unavailable and installation failed", allow_module_level=True)
 
+import numpy as np  # noqa: E402
 import qutip as qt  # noqa: E402
 
 from bh_core.delta_kernel import DeltaComputer
@@ -22,9 +23,241 @@ def test_flow_not():
     comp.accrete(qt.basis(2,0))   # qubit0 control |0>
     comp.accrete(qt.basis(2,1))   # qubit1 data |1>
     comp.accrete(qt.basis(2,0))   # qubit2 ancilla
-    # need ctrl<t1<t2, so reorder: ctrl=0, t1=1, t2=2  (we'll swap 1<->2)
+    # ctrl=0, t1=1, t2=2  (we'll swap 1<->2)
     comp.flow(0,1,2)
     z = comp.measure_z(0)
     # after swap data becomes |0>
     assert z > 0.9
-    assert abs(comp.trace_norm()-1)<1e-6 
\ No newline at end of file
+    assert abs(comp.trace_norm()-1)<1e-6 
+
+def test_perm_backend_matches_dense():
+    rho = qt.rand_dm([2] * 4, seed=1)
+    results = []
+    for backend in ("dense", "perm", "sparse"):
+        comp = DeltaComputer(flow_backend=backend)
+        comp.rho, comp.num_qubits = rho, 4
+        comp.flow(0, 1, 3)
+        comp.flow(1, 2, 3)
+        results.append(comp.rho.full())
+    assert abs(results[0] - results[1]).max() < 1e-12
+    assert abs(results[0] - results[2]).max() < 1e-12
+
+
+def test_sparse_backend_avoids_full_temporaries():
+    import tracemalloc
+    comp = DeltaComputer(flow_backend="sparse", mode="density")
+    comp.rho = qt.rand_dm([2] * 10, seed=3)
+    comp.flow(0, 1, 2)  # allocates the scratch buffer
+    tracemalloc.start()
+    comp.flow(3, 1, 2)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert peak < comp._data.nbytes // 4
+
+
+def test_statevector_matches_density():
+    plus = (qt.basis(2, 0) + qt.basis(2, 1)).unit()
+    comps = [DeltaComputer(mode="statevector"), DeltaComputer(mode="density")]
+    for comp in comps:
+        for ket in (plus, qt.basis(2, 1), qt.basis(2, 0), qt.basis(2, 0)):
+            comp.accrete(ket)
+        comp.execute([{"op": "FLOW", "ctrl": 0, "t1": 1, "t2": 2}])
+    sv, dm = comps
+    assert sv.is_pure and not dm.is_pure
+    for q in range(4):
+        assert abs(sv.measure_z(q) - dm.measure_z(q)) < 1e-12
+    assert sv.ent_matrix()[0, 1] > 0.5
+    assert abs(sv.ent_matrix() - dm.ent_matrix()).max() < 1e-9
+    assert abs(sv.rho.full() - dm.rho.full()).max() < 1e-12
+
+
+def test_auto_mode_promotes_on_mixed_state():
+    comp = DeltaComputer()
+    comp.accrete(qt.basis(2, 0))
+    assert comp.is_pure
+    comp.accrete(qt.maximally_mixed_dm(2))
+    assert not comp.is_pure and comp.num_qubits == 2
+
+
+def test_flow_operator_cache_hits():
+    from bh_core.op_cache import OperatorCache
+    cache = OperatorCache(max_bytes=1 << 20)
+    comp = DeltaComputer(3, cache=cache)
+    for _ in range(3):
+        comp.flow(0, 1, 2)
+    assert cache.stats()["misses"] == 1 and cache.stats()["hits"] == 2
+    assert cache.nbytes == 8 * np.dtype(np.intp).itemsize
+
+
+def test_uncacheable_indices_gather_per_block():
+    from bh_core.op_cache import OperatorCache
+    prog = [{"op": "FLOW", "ctrl": 0, "t1": 1, "t2": 2},
+            {"op": "PERM", "qubits": [1, 3], "table": [2, 0, 3, 1]},
+            {"op": "FLOW", "ctrl": 3, "t1": 0, "t2": 2}]
+    rho = qt.rand_dm([2] * 4, seed=4)
+    out = []
+    for cache in (OperatorCache(), OperatorCache(max_bytes=64)):  # 64 B: no 16-entry index fits
+        for mode in ("density", "statevector"):
+            comp = DeltaComputer(mode=mode, cache=cache)
+            if mode == "density":
+                comp.rho = rho
+            else:
+                comp.accrete_many([qt.rand_ket(2, seed=s) for s in range(4)])
+            comp.execute(prog)
+            out.append(comp.rho.full())
+    assert len(cache) == 0 and cache.stats()["misses"] == 0
+    assert abs(out[0] - out[2]).max() < 1e-12
+    assert abs(out[1] - out[3]).max() < 1e-12
+
+
+def test_fused_perm_matches_flows():
+    from bh_core.compiler import fuse_flows
+    prog = [{"op": "FLOW", "ctrl": 0, "t1": 1, "t2": 2},
+            {"op": "FLOW", "ctrl": 1, "t1": 2, "t2": 3},
+            {"op": "FLOW", "ctrl": 0, "t1": 2, "t2": 3}]
+    fused, _ = fuse_flows(prog)
+    rho = qt.rand_dm([2] * 4, seed=2)
+    out = []
+    for p in (prog, fused):
+        for mode in ("density", "statevector"):
+            comp = DeltaComputer(4, mode=mode)
+            if mode == "density":
+                comp.rho = rho
+            comp.execute(p)
+            out.append(comp.rho.full())
+    assert abs(out[0] - out[2]).max() < 1e-12
+    assert abs(out[1] - out[3]).max() < 1e-12
+
+
+def test_ent_matrix_incremental_matches_ptrace():
+    plus = (qt.basis(2, 0) + qt.basis(2, 1)).unit()
+    for mode in ("statevector", "density"):
+        comp = DeltaComputer(mode=mode)
+        for ket in (plus, qt.basis(2, 1), qt.basis(2, 0), plus):
+            comp.accrete(ket)
+        comp.ent_matrix()
+        comp.flow(0, 1, 2)
+        comp.accrete(plus)
+        comp.flow(2, 3, 4)
+        m = comp.ent_matrix()
+        rho = comp.rho
+        for i in range(5):
+            for j in range(i + 1, 5):
+                assert abs(m[i, j] - qt.entropy_vn(rho.ptrace([i, j]))) < 1e-9
+
+
+def test_measure_all_z_matches_expect():
+    rho = qt.rand_dm([2] * 3, seed=4)
+    for comp in (DeltaComputer(mode="density"), DeltaComputer(3, mode="statevector")):
+        if not comp.is_pure:
+            comp.rho, comp.num_qubits = rho, 3
+        comp.flow(0, 1, 2)
+        ref = [qt.expect(qt.sigmaz(), comp.rho.ptrace(q)) for q in range(3)]
+        assert np.allclose(comp.measure_all_z(), ref)
+        assert np.allclose(comp.marginal_probabilities().sum(axis=1), 1)
+
+
+def test_bulk_accretion_matches_accrete():
+    plus = (qt.basis(2, 0) + qt.basis(2, 1)).unit()
+    for mode in ("statevector", "density"):
+        ref, bulk, bits = (DeltaComputer(mode=mode) for _ in range(3))
+        for comp in (ref, bulk, bits):
+            comp.accrete(plus)
+        for b in "101":
+            ref.accrete(qt.basis(2, int(b)))
+        bulk.accrete_many([qt.basis(2, 1), qt.basis(2, 0), qt.basis(2, 1).proj()])
+        bits.load_bitstring("101")
+        for comp in (bulk, bits):
+            assert comp.num_qubits == 4 and comp.is_pure == ref.is_pure
+            assert abs(comp.rho.full() - ref.rho.full()).max() < 1e-12
+    comp = DeltaComputer()
+    for bad in (qt.basis(4, 1), qt.basis(3, 0), qt.tensor(plus, plus)):
+        with pytest.raises(ValueError, match="single-qubit"):
+            comp.accrete_many([plus, bad])
+    assert comp.num_qubits == 0
+
+
+def test_flow_any_qubit_order():
+    from bh_core.compiler import compile_program
+    prog = compile_program([{"op": "TOFF", "c1": 2, "c2": 1, "target": 0}])
+    rho = qt.rand_dm([2] * 3, seed=5)
+    out = []
+    for backend in ("dense", "perm"):
+        comp = DeltaComputer(flow_backend=backend)
+        comp.rho, comp.num_qubits = rho, 3
+        comp.execute(prog)
+        out.append(comp.rho.full())
+    assert abs(out[0] - out[1]).max() < 1e-12
+    with pytest.raises(ValueError):
+        comp.flow(1, 1, 2)   # ctrl == t1 is not a permutation
+
+
+def test_flow_reuses_state_buffers():
+    comp = DeltaComputer(mode="statevector")
+    comp.load_bitstring("0100")
+    comp.flow(0, 1, 2)
+    snapshot = comp.psi
+    buffers = {id(comp._data), id(comp._scratch)}
+    for _ in range(4):
+        comp.flow(0, 1, 2)
+    assert {id(comp._data), id(comp._scratch)} == buffers
+    assert abs(snapshot.full() - comp.psi.full()).max() < 1e-12   # even number of swaps
+    comp.flow(0, 1, 2)
+    assert abs(snapshot.full() - comp.psi.full()).max() > 0.5     # Qobj was a copy
+
+
+def test_threaded_flow_matches_serial(monkeypatch):
+    import bh_core.delta_kernel as dk
+    monkeypatch.setattr(dk, "PARALLEL_MIN_SIZE", 0)
+    rho = qt.rand_dm([2] * 9, seed=6)
+    out = []
+    for threads in (1, 3):
+        for mode in ("density", "statevector"):
+            comp = DeltaComputer(9 if mode == "statevector" else 0, mode=mode, threads=threads)
+            if mode == "density":
+                comp.rho = rho
+            comp.execute([{"op": "FLOW", "ctrl": 4, "t1": 0, "t2": 8},
+                          {"op": "FLOW", "ctrl": 8, "t1": 1, "t2": 2}])
+            out.append(comp.rho.full())
+            comp.close()
+    assert abs(out[0] - out[2]).max() < 1e-12
+    assert abs(out[1] - out[3]).max() < 1e-12
+
+
+def test_memmap_storage_and_checkpoint_resume(tmp_path, monkeypatch):
+    import bh_core.delta_kernel as dk
+    monkeypatch.setattr(dk, "STREAM_CHUNK", 16)   # force several streaming passes
+    prog = [{"op": "FLOW", "ctrl": c, "t1": a, "t2": b}
+            for c, a, b in [(0, 1, 5), (5, 2, 3), (3, 0, 4), (1, 4, 2)]]
+    prog.append({"op": "PERM", "qubits": [1, 3], "table": [2, 0, 3, 1]})
+    for mode in ("statevector", "density"):
+        ref = DeltaComputer(mode=mode)
+        ref.accrete_many([(qt.basis(2, 0) + qt.basis(2, 1)).unit()] + [qt.basis(2, 1)] * 5)
+        ref.execute(prog)
+        disk = DeltaComputer(mode=mode, storage=str(tmp_path / mode))
+        disk.accrete_many([(qt.basis(2, 0) + qt.basis(2, 1)).unit()] + [qt.basis(2, 1)] * 5)
+        assert isinstance(disk._data, np.memmap)
+        ckpt = str(tmp_path / (mode + "-ckpt"))
+        disk.execute(prog[:3], checkpoint=ckpt, every=2, tag={"input": "011111"})
+        with pytest.raises(ValueError):
+            DeltaComputer.restore(ckpt, tag={"input": "000000"})
+        resumed, step = DeltaComputer.restore(ckpt, tag={"input": "011111"},
+                                              storage=str(tmp_path / (mode + "-resumed")))
+        assert step == 2
+        resumed.execute(prog, start=step)
+        assert abs(resumed.rho.full() - ref.rho.full()).max() < 1e-12
+        DeltaComputer.clear_checkpoint(ckpt)
+        assert os.listdir(ckpt) == []
+
+
+def test_storage_buffers_are_private_and_cleaned_up(tmp_path):
+    a = DeltaComputer(mode="statevector", storage=str(tmp_path))
+    a.load_bitstring("0000")
+    b = DeltaComputer(mode="statevector", storage=str(tmp_path))
+    b.load_bitstring("1111")
+    a.flow(0, 1, 2)
+    b.flow(0, 1, 2)
+    assert list(a.measure_all_z()) == [1.0] * 4
+    a.close()
+    b.close()
+    assert os.listdir(tmp_path) == []
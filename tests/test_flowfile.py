@@ -0,0 +1,42 @@
+# ensure path
+import sys, pathlib, subprocess, json
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+import numpy as np
+
+from bh_core.bit_kernel import BitComputer
+from bh_core.compiler import compile_program
+from bh_core.flowfile import json_to_binary, load_binary, save_binary, to_flow_list
+
+
+def test_binary_roundtrip_and_execute(tmp_path):
+    prog = compile_program([{"op": "NOT", "target": 1}, {"op": "TOFF", "c1": 1, "c2": 2, "target": 3}])
+    path = tmp_path / "prog.bhf"
+    assert save_binary(str(path), prog) == 4
+    rows = load_binary(str(path))
+    assert isinstance(rows.rows, np.memmap) and rows.rows.shape == (4, 3)
+    assert to_flow_list(rows) == prog
+    a, b = BitComputer("01100"), BitComputer("01100")
+    a.execute(prog)
+    b.execute(rows)
+    assert a.output() == b.output()
+
+
+def test_cli_runs_binary_program(tmp_path):
+    src = tmp_path / "not.json"
+    json.dump([{"op": "NOT", "target": 1}], src.open("w"))
+    json_to_binary(str(src), str(tmp_path / "not.bhf"))
+    result = subprocess.run([sys.executable, "-m", "bh_core.simulate_bh", str(tmp_path / "not.bhf"), "010"],
+                            capture_output=True, text=True, cwd=pathlib.Path(__file__).resolve().parents[1])
+    assert result.stdout.strip() == "001"
+
+
+def test_save_binary_streams_iterators_in_chunks(tmp_path, monkeypatch):
+    from bh_core import flowfile
+    from bh_core.compiler import compile_iter
+    gates = [{"op": "NOT", "target": 1}, {"op": "TOFF", "c1": 1, "c2": 2, "target": 3}]
+    monkeypatch.setattr(flowfile, "WRITE_CHUNK", 3)
+    path = tmp_path / "prog.bhf"
+    assert save_binary(str(path), compile_iter(gates)) == 4
+    assert to_flow_list(load_binary(str(path))) == compile_program(gates)
+    assert save_binary(str(path), iter([])) == 0 and len(load_binary(str(path))) == 0
@@ -0,0 +1,51 @@
+# ensure path
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+import numpy as np
+import pytest
+
+from bh_core.compiler import compile_flows
+from bh_core.delta_kernel import DeltaComputer
+from bh_core.noise import NoiseModel, amplitude_damping, bit_flip, run_exact, run_trajectories
+
+GATES = [{"op": "NOT", "target": 1}, {"op": "TOFF", "c1": 1, "c2": 2, "target": 3}]
+
+
+def test_exact_channels():
+    comp = DeltaComputer(mode="auto")
+    comp.load_bitstring("011")
+    comp.apply_channel(2, amplitude_damping(0.3))
+    assert not comp.is_pure  # promoted to a density matrix
+    comp.apply_channel(0, bit_flip(0.1))
+    probs = comp.probabilities()
+    assert np.isclose(probs.sum(), 1)
+    assert np.allclose(comp.marginal_probabilities()[[0, 2]], [[0.9, 0.1], [0.3, 0.7]])
+    sv = DeltaComputer(mode="statevector")
+    sv.load_bitstring("011")
+    with pytest.raises(ValueError):
+        sv.apply_channel(0, bit_flip(0.1))
+
+
+def test_trajectories_match_exact_density():
+    prog = compile_flows(GATES)
+    noise = NoiseModel(bit_flip=0.05, dephasing=0.1, amplitude_damping=0.1)
+    exact = run_exact(prog, "01100", noise)
+    sampled = run_trajectories(prog, "01100", noise, shots=600, seed=7, processes=2)
+    assert np.isclose(sampled.sum(), 1)
+    assert np.abs(sampled - exact).max() < 0.06
+    noiseless = run_trajectories(prog, "01100", NoiseModel(), shots=3, seed=0)
+    assert np.allclose(noiseless, run_exact(prog, "01100", NoiseModel()))
+
+
+def test_sampled_channel_invalidates_entanglement_cache():
+    import qutip as qt
+    for seed in range(4):
+        comp = DeltaComputer(mode="statevector")
+        comp.accrete_many([(qt.basis(2, 0) + qt.basis(2, 1)).unit(), qt.basis(2, 1), qt.basis(2, 0)])
+        comp.flow(0, 1, 2)  # |001> + |110>: every pair entangled
+        comp.ent_matrix()  # populate the cache
+        comp.apply_channel(2, amplitude_damping(0.9), np.random.default_rng(seed))
+        fresh = DeltaComputer(mode="density")
+        fresh.rho = comp.rho
+        assert np.allclose(comp.ent_matrix(), fresh.ent_matrix())
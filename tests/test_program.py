@@ -0,0 +1,44 @@
+# ensure path
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+import numpy as np
+import pytest
+
+from bh_core.batch import run_batch
+from bh_core.bit_kernel import BitComputer
+from bh_core.compiler import compile_flows, compile_program, fuse_flows, optimize_program
+from bh_core.delta_kernel import DeltaComputer
+from bh_core.program import FlowProgram
+
+GATES = [{"op": "NOT", "target": 1}, {"op": "TOFF", "c1": 1, "c2": 2, "target": 3},
+         {"op": "NOT", "target": 2}, {"op": "NOT", "target": 2}]
+
+
+def test_columns_slicing_and_concat():
+    prog = compile_flows(GATES)
+    assert len(prog) == 6 and prog.rows.dtype == np.int32
+    assert prog.to_flows() == compile_program(GATES)
+    assert prog[1] == (1, 2, 3) and list(prog.ctrl[:2]) == [0, 1]
+    assert isinstance(prog[2:4], FlowProgram) and len(prog[2:4]) == 2
+    assert prog[:3] + prog[3:] == prog
+    assert FlowProgram.concat([prog, prog]).num_qubits() == 4
+    with pytest.raises(ValueError):
+        FlowProgram([(0, 1, 1)]).check(3)
+
+
+def test_executors_and_optimizer_accept_flow_program():
+    prog = compile_flows(GATES)
+    opt, stats = optimize_program(prog, 1)
+    assert isinstance(opt, FlowProgram) and stats["cancelled"] == 2 and len(opt) == 4
+    fused, _ = fuse_flows(prog, 4)
+    for p in (opt, fused):
+        a, b = BitComputer("01100"), BitComputer("01100")
+        a.execute(compile_program(GATES))
+        b.execute(p)
+        assert a.output() == b.output()
+    d = DeltaComputer(mode="statevector")
+    d.load_bitstring("01100")
+    d.execute(prog)
+    assert "".join("0" if z > 0 else "1" for z in d.measure_all_z()) == a.output()
+    assert next(run_batch(prog, ["01100"])) == [a.output()]
@@ -0,0 +1,92 @@
+# ensure path
+import sys, pathlib, asyncio, json
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from bh_core.bit_kernel import BitComputer
+from bh_core.compiler import compile_program
+from bh_core.server import SimulatorServer
+
+GATES = [{"op": "NOT", "target": 1}, {"op": "TOFF", "c1": 1, "c2": 2, "target": 3}]
+
+
+def expected(bits):
+    comp = BitComputer(bits)
+    comp.execute(compile_program(GATES))
+    return comp.output()
+
+
+def test_server_over_unix_socket(tmp_path):
+    sock = str(tmp_path / "bh.sock")
+    server = SimulatorServer(max_programs=1)
+
+    async def client(requests):
+        reader, writer = await asyncio.open_unix_connection(sock)
+        writer.write(b"".join(json.dumps(r).encode() + b"\n" for r in requests))
+        replies = [json.loads(await reader.readline()) for _ in requests]
+        writer.close()
+        return replies
+
+    async def scenario():
+        task = asyncio.create_task(server.serve(sock))
+        while not pathlib.Path(sock).exists():
+            await asyncio.sleep(0.01)
+        (loaded,) = await client([{"op": "load", "program": GATES}])
+        key = loaded["hash"]
+        a, b = await asyncio.gather(
+            client([{"hash": key, "input": "01100"}, {"hash": key, "inputs": ["01010", "00110"]}]),
+            client([{"hash": key, "input": "01010", "backend": "statevector"}, {"hash": "nope", "input": "0"}]))
+        c = await client([{"op": "load", "program": GATES[:1]}, {"hash": key, "input": "0"}, {"op": "stats"}])
+        task.cancel()
+        return loaded, a, b, c
+
+    loaded, a, b, c = asyncio.run(scenario())
+    assert loaded["ok"] and loaded["gates"] == 4
+    assert a[0]["output"] == expected("01100") and a[0]["metrics"]["total_us"] > 0
+    assert a[1]["outputs"] == [expected("01010"), expected("00110")]
+    assert b[0]["output"] == expected("01010")
+    assert not b[1]["ok"] and "Unknown program hash" in b[1]["error"]
+    assert not c[1]["ok"]  # evicted: the LRU holds one program
+    assert c[2]["programs"] == 1 and c[2]["errors"] == 2
+
+
+def test_slow_load_does_not_block_other_requests(monkeypatch):
+    import time
+    compile_ = SimulatorServer.compile
+    monkeypatch.setattr(SimulatorServer, "compile", staticmethod(lambda *a: (time.sleep(0.3), compile_(*a))[1]))
+    server = SimulatorServer()
+
+    async def scenario():
+        load = asyncio.create_task(server.dispatch(json.dumps({"op": "load", "program": GATES}).encode()))
+        await asyncio.sleep(0.05)
+        stats = await server.dispatch(b'{"op": "stats"}')
+        return stats, load.done(), await load
+
+    stats, load_done, loaded = asyncio.run(scenario())
+    assert stats["ok"] and not load_done
+    assert loaded["ok"] and loaded["gates"] == 4
+
+
+def test_bad_requests_get_error_replies(tmp_path):
+    sock = str(tmp_path / "bh.sock")
+    server = SimulatorServer()
+    lines = [b"[1]", b"5", b'{"op": "load", "program": []}']
+
+    async def scenario():
+        task = asyncio.create_task(server.serve(sock))
+        while not pathlib.Path(sock).exists():
+            await asyncio.sleep(0.01)
+        reader, writer = await asyncio.open_unix_connection(sock)
+        writer.write(b"".join(line + b"\n" for line in lines))
+        replies = [json.loads(await reader.readline()) for _ in lines]
+        key = replies[-1]["hash"]
+        writer.write(json.dumps({"hash": key, "input": "", "backend": "statevector"}).encode() + b"\n")
+        writer.write(json.dumps({"hash": key, "input": "01"}).encode() + b"\n")
+        replies += [json.loads(await reader.readline()) for _ in range(2)]
+        writer.close()
+        task.cancel()
+        return replies
+
+    replies = asyncio.run(scenario())
+    assert [r["ok"] for r in replies] == [False, False, True, False, True]
+    assert "JSON object" in replies[0]["error"] and replies[4]["output"] == "01"
+    assert server.errors == 3
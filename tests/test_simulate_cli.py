@@ -12,4 +12,91 @@ def test_cli_not(tmp_path):
     if result.returncode != 0 and "qutip unavailable" in result.stderr:
         pytest.skip("qutip could not be installed in this environment")
     assert result.returncode == 0
-    assert result.stdout.strip() == "001" 
\ No newline at end of file
+    assert result.stdout.strip() == "001" 
+
+def test_cli_steps_json_report(tmp_path):
+    prog_path = tmp_path/"not.json"
+    json.dump([{"op":"NOT","target":1}], prog_path.open("w"))
+    result = subprocess.run([sys.executable, "-m", "bh_core.simulate_bh", str(prog_path), "010",
+                             "--steps", "3", "--json", "--cache-dir", str(tmp_path/"cache")],
+                            capture_output=True, text=True)
+    assert result.returncode == 0
+    rep = json.loads(result.stdout)
+    assert rep["output"] == "001" and rep["steps"] == 3 and rep["gates"] == 1
+    assert set(rep["seconds"]) == {"load", "compile", "accrete", "execute", "readout"}
+    assert rep["gates_per_second"] > 0 and rep["peak_rss_bytes"] > 0
+
+
+def test_cli_reports_rejected_program_without_traceback(tmp_path):
+    prog_path = tmp_path/"cnot.json"
+    json.dump([{"op": "CNOT", "control": 1, "target": 2}], prog_path.open("w"))
+    result = subprocess.run([sys.executable, "-m", "bh_core.simulate_bh", str(prog_path), "010"],
+                            capture_output=True, text=True)
+    assert result.returncode == 1
+    assert "Traceback" not in result.stderr and "distinct" in result.stderr
+
+
+def test_cli_startup_does_not_import_qutip(tmp_path):
+    prog_path = tmp_path/"not.json"
+    json.dump([{"op":"NOT","target":1}], prog_path.open("w"))
+    code = ("import sys; sys.argv = ['simulate_bh', sys.argv[1], '010', '--no-cache', '--backend', 'statevector']; "
+            "import bh_core.simulate_bh as cli; cli.main(); assert 'qutip' not in sys.modules")
+    result = subprocess.run([sys.executable, "-c", code, str(prog_path)], capture_output=True, text=True,
+                            cwd=pathlib.Path(__file__).resolve().parents[1])
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "001"
+
+
+def test_cli_streams_many_inputs(tmp_path):
+    prog_path = tmp_path/"prog.json"
+    json.dump([{"op":"NOT","target":1}, {"op":"TOFF","c1":1,"c2":2,"target":3}], prog_path.open("w"))
+    inputs = ["01100", "01010", "00110"] * 5
+    expected = None
+    for backend, jobs in (("auto", "1"), ("auto", "2"), ("statevector", "2")):
+        result = subprocess.run([sys.executable, "-m", "bh_core.simulate_bh", str(prog_path), "--inputs", "-",
+                                 "--backend", backend, "--jobs", jobs, "--chunk", "4", "--no-cache"],
+                                input="\n".join(inputs) + "\n", capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+        outs = result.stdout.split()
+        assert len(outs) == len(inputs)
+        expected = expected or outs
+        assert outs == expected
+    assert expected[:3] == ["01100", "00110", "01010"]
+
+
+def test_cli_fused_program_with_many_inputs(tmp_path):
+    prog_path = tmp_path/"prog.json"
+    json.dump([{"op":"NOT","target":1}, {"op":"TOFF","c1":1,"c2":2,"target":3}], prog_path.open("w"))
+    inputs = "01100\n01010\n00110\n"
+    outs = []
+    for fuse in ([], ["--fuse", "4"]):
+        result = subprocess.run([sys.executable, "-m", "bh_core.simulate_bh", str(prog_path), "--inputs", "-", "--no-cache"]
+                                + fuse, input=inputs, capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+        outs.append(result.stdout.split())
+    assert outs[0] == outs[1] == ["01100", "00110", "01010"]
+
+
+def test_cli_reports_opt_stats_with_cache(tmp_path):
+    prog_path = tmp_path/"prog.json"
+    json.dump([{"op":"NOT","target":1}, {"op":"NOT","target":1}, {"op":"NOT","target":2}], prog_path.open("w"))
+    cmd = [sys.executable, "-m", "bh_core.simulate_bh", str(prog_path), "0100", "-O", "1", "--cache-dir", str(tmp_path/"cache")]
+    miss = subprocess.run(cmd, capture_output=True, text=True)
+    hit = subprocess.run(cmd, capture_output=True, text=True)
+    assert miss.returncode == hit.returncode == 0
+    assert "-O1: 3 -> 1 FLOWs (2 cancelled, 0 no-ops)" in miss.stderr
+    assert "-O1: 1 FLOWs (cached)" in hit.stderr
+    assert miss.stdout == hit.stdout
+
+
+def test_cli_rejects_storage_and_checkpoint_on_bits_backend(tmp_path):
+    prog_path = tmp_path/"not.json"
+    json.dump([{"op":"NOT","target":1}], prog_path.open("w"))
+    for flag in ("--storage", "--checkpoint"):
+        result = subprocess.run([sys.executable, "-m", "bh_core.simulate_bh", str(prog_path), "010", "--no-cache",
+                                 flag, str(tmp_path/"dir")], capture_output=True, text=True)
+        assert result.returncode == 1 and "statevector or density" in result.stderr
+    assert not (tmp_path/"dir").exists()
+    result = subprocess.run([sys.executable, "-m", "bh_core.simulate_bh", str(prog_path), "010", "--no-cache",
+                             "--backend", "statevector", "--checkpoint", str(tmp_path/"dir")], capture_output=True, text=True)
+    assert result.returncode == 0 and result.stdout.strip() == "001"
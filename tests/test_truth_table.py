@@ -0,0 +1,44 @@
+# ensure path
+import sys, pathlib, os
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+import numpy as np
+import pytest
+
+from bh_core.bit_kernel import BitComputer
+from bh_core.compiler import compile_flows, compile_program, fuse_flows
+from bh_core.flowfile import save_binary
+from bh_core.truth_table import build_table, load_table, lookup, lookup_many, table_path
+
+GATES = [{"op": "NOT", "target": 1}, {"op": "TOFF", "c1": 1, "c2": 2, "target": 3},
+         {"op": "NOT", "target": 4}, {"op": "TOFF", "c1": 3, "c2": 5, "target": 1}]
+
+
+def test_table_matches_bit_kernel():
+    prog = compile_flows(GATES)
+    inputs = [format(i, "06b") for i in range(64)]
+    expected = []
+    for bits in inputs:
+        comp = BitComputer(bits)
+        comp.execute(prog)
+        expected.append(comp.output())
+    for p in (prog, compile_program(GATES), fuse_flows(prog, 4)[0]):
+        table = build_table(p, 6)
+        assert table.dtype == np.uint32 and sorted(table) == list(range(64))
+        assert [lookup(table, b) for b in inputs] == expected
+        assert lookup_many(table, inputs) == expected
+    with pytest.raises(ValueError):
+        lookup_many(build_table(prog, 6), ["011", "011010", "011010011"])
+    with pytest.raises(ValueError):
+        build_table(prog, 3)
+
+
+def test_table_persists_next_to_program(tmp_path):
+    path = str(tmp_path / "prog.bhf")
+    prog = compile_flows(GATES)
+    save_binary(path, prog)
+    table = load_table(path, prog, 6)
+    assert isinstance(table, np.memmap) and os.path.exists(table_path(path, 6))
+    mtime = os.path.getmtime(table_path(path, 6))
+    assert np.array_equal(load_table(path, prog, 6), build_table(prog, 6))
+    assert os.path.getmtime(table_path(path, 6)) == mtime  # reused, not rebuilt